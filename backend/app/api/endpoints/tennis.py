@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from app.services.vector_store import TennisVectorStore
-from app.services.chat_service import TennisChatService
+from fastapi import APIRouter, Depends, HTTPException
+from app.services.container import ServiceContainer, get_container
 
 router = APIRouter()
 
 
 @router.post("/analyze")
-async def analyze_tennis_query(query: str):
+async def analyze_tennis_query(
+    query: str, container: ServiceContainer = Depends(get_container)
+):
     try:
-        vector_store = TennisVectorStore()
-        chat_service = TennisChatService()
+        vector_store = container.vector_store
+        chat_service = container.chat_service
 
         matches, analysis = await vector_store.search_matches(query)
         response = await chat_service.analyze_query(query, matches, analysis)
@@ -1,7 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from ..services.rag_service import TennisRAGService
+from ..services.container import ServiceContainer, get_container, service_lifespan
 import logging
 import os
 from dotenv import load_dotenv
@@ -13,7 +13,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(lifespan=service_lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -46,11 +46,18 @@ async def health_check():
 
 
 @app.post("/api/query")
-async def query_tennis(request: QueryRequest) -> QueryResponse:
+async def query_tennis(
+    request: QueryRequest, container: ServiceContainer = Depends(get_container)
+) -> QueryResponse:
     try:
-        rag_service = TennisRAGService()
-        response = await rag_service.answer_query(request.question)
+        response = await container.rag_service.answer_query(request.question)
         return QueryResponse(**response)
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/pool-stats")
+async def pool_stats(container: ServiceContainer = Depends(get_container)):
+    """Connection pool reuse for the shared clients"""
+    return container.pool_stats()
@@ -1,39 +1,195 @@
+import os
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 
+# Explicit column types for the match CSVs. Repeated strings are
+# categoricals and the per-match stats are nullable int16, which keeps the
+# resident frame a fraction of the size of pandas' inferred object/float64
+# columns and skips dtype inference on every file.
+MATCH_DTYPES = {
+    "tourney_id": "category",
+    "tourney_name": "category",
+    "surface": "category",
+    "draw_size": "Int16",
+    "tourney_level": "category",
+    "tourney_date": "int32",
+    "match_num": "Int16",
+    "winner_id": "Int32",
+    "winner_seed": "category",
+    "winner_entry": "category",
+    "winner_name": "category",
+    "winner_hand": "category",
+    "winner_ht": "float32",
+    "winner_ioc": "category",
+    "winner_age": "float32",
+    "loser_id": "Int32",
+    "loser_seed": "category",
+    "loser_entry": "category",
+    "loser_name": "category",
+    "loser_hand": "category",
+    "loser_ht": "float32",
+    "loser_ioc": "category",
+    "loser_age": "float32",
+    "score": "string",
+    "best_of": "Int8",
+    "round": "category",
+    "minutes": "Int16",
+    **{
+        f"{side}_{stat}": "Int16"
+        for side in ("w", "l")
+        for stat in [
+            "ace",
+            "df",
+            "svpt",
+            "1stIn",
+            "1stWon",
+            "2ndWon",
+            "SvGms",
+            "bpSaved",
+            "bpFaced",
+        ]
+    },
+    "winner_rank": "float32",
+    "winner_rank_points": "float32",
+    "loser_rank": "float32",
+    "loser_rank_points": "float32",
+}
+
 
 class ATPDataLoader:
     """Loader for Jeff Sackmann's ATP tennis dataset"""
 
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, dtypes: Optional[Dict[str, str]] = None):
         self.data_path = Path(data_path)
+        self.dtypes = MATCH_DTYPES if dtypes is None else dtypes
 
     def load_matches(
-        self, year: Optional[int] = None, start_year: int = 1968, end_year: int = 2024
+        self,
+        year: Optional[int] = None,
+        start_year: int = 1968,
+        end_year: int = 2024,
+        columns: Optional[List[str]] = None,
+        workers: Optional[int] = None,
     ) -> pd.DataFrame:
-        """Load ATP match data for specified year(s)"""
+        """Load ATP match data for specified year(s)
+
+        Yearly files are parsed in parallel across a process pool (``workers``
+        defaults to the CPU count) and only ``columns`` are read when given.
+        With a single worker the files are read plainly and the schema is
+        applied once to the combined frame.
+        """
         if year:
-            return self._load_single_year(year)
+            return self._load_single_year(year, columns)
 
-        dfs = []
+        paths = []
         for year in range(start_year, end_year + 1):
-            try:
-                df = self._load_single_year(year)
-                dfs.append(df)
-            except FileNotFoundError:
+            file_path = self._year_path(year)
+            if file_path.exists():
+                paths.append(file_path)
+            else:
                 print(f"Warning: No data found for {year}")
-                continue
+        if not paths:
+            raise FileNotFoundError(
+                f"No ATP match files for {start_year}-{end_year} in {self.data_path}"
+            )
 
-        return pd.concat(dfs, ignore_index=True)
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        if workers == 1:
+            # Without a pool the per-file schema work (category inference,
+            # narrowing, merging categories) costs more than parsing, so the
+            # files are read plainly and the schema applied once
+            dfs = [_read_text(path, columns, self.dtypes) for path in paths]
+            return _apply_dtypes(pd.concat(dfs, ignore_index=True), self.dtypes)
 
-    def _load_single_year(self, year: int) -> pd.DataFrame:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            dfs = list(
+                pool.map(
+                    _read_matches,
+                    paths,
+                    [columns] * len(paths),
+                    [self.dtypes] * len(paths),
+                )
+            )
+        return _concat_matches(dfs)
+
+    def _load_single_year(
+        self, year: int, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """Load single year of ATP match data"""
-        file_path = self.data_path / f"atp_matches_{year}.csv"
-        return pd.read_csv(file_path)
+        return _read_matches(self._year_path(year), columns, self.dtypes)
+
+    def _year_path(self, year: int) -> Path:
+        return self.data_path / f"atp_matches_{year}.csv"
 
     def load_player_data(self) -> pd.DataFrame:
         """Load player biographical data"""
         file_path = self.data_path / "atp_players.csv"
         return pd.read_csv(file_path)
+
+
+def _read_matches(
+    path: Path, columns: Optional[List[str]], dtypes: Dict[str, str]
+) -> pd.DataFrame:
+    """Parse one yearly file with the explicit schema (runs in a worker)"""
+    usecols = (lambda col: col in columns) if columns else None
+
+    # The C parser is much slower at nullable integers than at floats, so
+    # those columns are parsed as float32 and narrowed afterwards
+    nullable = {col for col, dtype in dtypes.items() if dtype[:3] == "Int"}
+    parse = {
+        col: "float32" if col in nullable else dtype for col, dtype in dtypes.items()
+    }
+    df = pd.read_csv(path, usecols=usecols, dtype=parse)
+
+    for col in nullable & set(df.columns):
+        try:
+            df[col] = df[col].astype(dtypes[col])
+        except (TypeError, ValueError):
+            # Fractional or out-of-range values; keep the float32 column
+            pass
+    return df
+
+
+def _read_text(
+    path: Path, columns: Optional[List[str]], dtypes: Dict[str, str]
+) -> pd.DataFrame:
+    """Parse one yearly file, keeping string columns as text so that
+    numeric-looking values (seeds) are not read as floats"""
+    usecols = (lambda col: col in columns) if columns else None
+    text = {
+        col: "object"
+        for col, dtype in dtypes.items()
+        if dtype in ("category", "string")
+    }
+    return pd.read_csv(path, usecols=usecols, dtype=text)
+
+
+def _apply_dtypes(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Convert a plainly parsed frame to the explicit schema"""
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            # Fractional or out-of-range values; keep the parsed column
+            pass
+    return df
+
+
+def _concat_matches(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate yearly frames without losing their categorical columns"""
+    for col in dfs[0].columns:
+        parts = [df[col] for df in dfs if col in df.columns]
+        if not all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            continue
+        # pd.concat falls back to object unless every frame shares categories
+        categories = union_categoricals(parts).categories
+        for df in dfs:
+            if col in df.columns:
+                df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(dfs, ignore_index=True)
@@ -0,0 +1,315 @@
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .record_builder import RECORD_STAT_COLUMNS, build_match_records
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+# Columns that every usable match must have
+REQUIRED_COLUMNS = [
+    "winner_name",
+    "loser_name",
+    "score",
+    "tourney_name",
+    "surface",
+    "round",
+    "tourney_level",
+]
+
+# Dictionary-encoded string columns (int32 codes + vocabulary)
+STRING_COLUMNS = REQUIRED_COLUMNS + ["tourney_id", "winner_id", "loser_id"]
+
+# Integer columns stored as int32
+INT_COLUMNS = ["tourney_date", "match_num"]
+
+# Optional numeric columns stored as float32 with NaN for missing values
+RANK_COLUMNS = ["winner_rank", "loser_rank"]
+STAT_COLUMNS = RECORD_STAT_COLUMNS
+FLOAT_COLUMNS = RANK_COLUMNS + STAT_COLUMNS
+
+# On-disk dtype per column kind (string columns store their codes)
+_KIND_DTYPES = {"str": np.int32, "int32": np.int32, "float32": np.float32}
+
+
+class ATPCorpusCache:
+    """Typed, memory-mappable columnar cache of the yearly ATP match CSVs.
+
+    The CSVs are parsed once into one ``.npy`` file per column. String
+    columns are dictionary-encoded (int32 codes plus a JSON vocabulary) and
+    numeric columns are stored as int32/float32. Later runs memory-map the
+    arrays and only rebuild when a source file's mtime and content hash
+    change.
+    """
+
+    def __init__(self, data_path: str, cache_dir: Optional[str] = None):
+        self.data_path = Path(data_path)
+        self.cache_dir = (
+            Path(cache_dir) if cache_dir else self.data_path / ".corpus_cache"
+        )
+        self.manifest_path = self.cache_dir / "manifest.json"
+
+    def source_files(self) -> List[Path]:
+        return sorted(self.data_path.glob("atp_matches_????.csv"))
+
+    def is_fresh(self) -> bool:
+        """Check the cache against the current source files.
+
+        Files whose mtime changed but whose content hash did not are
+        re-stamped in the manifest so the next check stays cheap.
+        """
+        if not self.manifest_path.exists():
+            return False
+
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CACHE_VERSION:
+            return False
+
+        cached = manifest["sources"]
+        files = self.source_files()
+        if sorted(cached) != [file.name for file in files]:
+            return False
+
+        touched = False
+        for file in files:
+            entry = cached[file.name]
+            stat = file.stat()
+            if stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]:
+                continue
+            if _file_hash(file) != entry["sha1"]:
+                logger.info(f"Source changed: {file.name}")
+                return False
+            entry["mtime_ns"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            touched = True
+
+        if touched:
+            self._write_manifest(manifest)
+        return True
+
+    def build(self) -> None:
+        """Parse every source CSV once and write the columnar cache."""
+        files = self.source_files()
+        if not files:
+            raise FileNotFoundError(f"No ATP match files found in {self.data_path}")
+
+        logger.info(f"Building corpus cache from {len(files)} files...")
+
+        tmp_dir = self.cache_dir.with_name(self.cache_dir.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        # Files are read one at a time and appended column by column, so
+        # peak memory is one yearly file rather than the whole corpus
+        present = set()
+        for file in files:
+            present.update(pd.read_csv(file, nrows=0).columns)
+        kinds = {col: "str" for col in STRING_COLUMNS if col in present}
+        kinds.update({col: "int32" for col in INT_COLUMNS if col in present})
+        kinds.update({col: "float32" for col in FLOAT_COLUMNS if col in present})
+
+        writers = {
+            col: _ColumnWriter(tmp_dir / f"{col}.npy", _KIND_DTYPES[kind])
+            for col, kind in kinds.items()
+        }
+        vocabs: Dict[str, Dict[str, int]] = {
+            col: {} for col, kind in kinds.items() if kind == "str"
+        }
+        total = 0
+        rows = 0
+
+        for file in files:
+            df = pd.read_csv(file)
+            total += len(df)
+            df = df.dropna(subset=REQUIRED_COLUMNS)
+            rows += len(df)
+
+            for col, kind in kinds.items():
+                if col not in df.columns:
+                    fill = -1 if kind == "str" else 0 if kind == "int32" else np.nan
+                    writers[col].append(np.full(len(df), fill))
+                elif kind == "str":
+                    writers[col].append(_encode_strings(df[col], vocabs[col]))
+                elif kind == "int32":
+                    writers[col].append(df[col].fillna(0).to_numpy(np.int32))
+                else:
+                    writers[col].append(df[col].to_numpy(np.float32))
+
+        logger.info(f"Total matches found: {total:,}")
+        for writer in writers.values():
+            writer.finish()
+        for col, vocab in vocabs.items():
+            with open(tmp_dir / f"{col}.vocab.json", "w") as f:
+                json.dump(list(vocab), f)
+
+        manifest = {
+            "version": CACHE_VERSION,
+            "rows": rows,
+            "columns": kinds,
+            "sources": {
+                file.name: {
+                    "size": file.stat().st_size,
+                    "mtime_ns": file.stat().st_mtime_ns,
+                    "sha1": _file_hash(file),
+                }
+                for file in files
+            },
+        }
+        with open(tmp_dir / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+        tmp_dir.rename(self.cache_dir)
+        logger.info(f"Corpus cache written to {self.cache_dir} ({rows:,} matches)")
+
+    def ensure(self) -> None:
+        """Build the cache if it is missing or stale."""
+        if not self.is_fresh():
+            self.build()
+
+    def load(self) -> "CorpusColumns":
+        """Memory-map the cached columns, rebuilding first if needed."""
+        self.ensure()
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        arrays = {}
+        vocabs = {}
+        for col, kind in manifest["columns"].items():
+            arrays[col] = np.load(self.cache_dir / f"{col}.npy", mmap_mode="r")
+            if kind == "str":
+                with open(self.cache_dir / f"{col}.vocab.json") as f:
+                    vocabs[col] = np.array(json.load(f) + [None], dtype=object)
+        return CorpusColumns(manifest["rows"], arrays, vocabs)
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        with open(self.manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+class CorpusColumns:
+    """Memory-mapped column arrays of the cached corpus."""
+
+    def __init__(self, rows: int, arrays: Dict[str, np.ndarray], vocabs: Dict):
+        self.rows = rows
+        self.arrays = arrays
+        # Each vocabulary has a trailing None so code -1 decodes to missing
+        self.vocabs = vocabs
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def has(self, col: str) -> bool:
+        return col in self.arrays
+
+    def strings(self, col: str, start: int = 0, stop: Optional[int] = None):
+        """Decode a dictionary-encoded column to an object array."""
+        return self.vocabs[col][self.arrays[col][start:stop]]
+
+    def values(self, col: str, start: int = 0, stop: Optional[int] = None):
+        return np.asarray(self.arrays[col][start:stop])
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Expose the cache as a DataFrame with categorical string columns."""
+        return self._frame(0, self.rows, columns)
+
+    def iter_frames(
+        self, columns: Optional[List[str]] = None, chunk_size: int = 100000
+    ) -> Iterator[pd.DataFrame]:
+        """Yield the cache as consecutive DataFrames of ``chunk_size`` rows."""
+        for start in range(0, self.rows, chunk_size):
+            yield self._frame(start, min(start + chunk_size, self.rows), columns)
+
+    def _frame(
+        self, start: int, stop: int, columns: Optional[List[str]]
+    ) -> pd.DataFrame:
+        data = {}
+        for col in columns or self.arrays:
+            array = self.arrays[col]
+            if col in self.vocabs:
+                data[col] = pd.Categorical.from_codes(
+                    np.asarray(array[start:stop]), categories=self.vocabs[col][:-1]
+                )
+            else:
+                data[col] = np.asarray(array[start:stop])
+        return pd.DataFrame(data)
+
+    def iter_match_records(self, chunk_size: int = 10000) -> Iterator[Dict]:
+        """Yield match records, building each chunk with column operations."""
+        for start in range(0, self.rows, chunk_size):
+            stop = min(start + chunk_size, self.rows)
+            yield from self._build_chunk(start, stop)
+
+    def _build_chunk(self, start: int, stop: int) -> List[Dict]:
+        columns = {
+            col: (
+                self.strings(col, start, stop)
+                if col in self.vocabs
+                else self.values(col, start, stop)
+            )
+            for col in self.arrays
+        }
+        return build_match_records(columns)
+
+
+class _ColumnWriter:
+    """Append-only ``.npy`` writer for a column of unknown final length.
+
+    Chunks go to a raw part file; the ``.npy`` header is written once the
+    row count is known and the data is streamed in behind it.
+    """
+
+    def __init__(self, path: Path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.part_path = path.with_name(path.name + ".part")
+        self.part = open(self.part_path, "wb")
+        self.rows = 0
+
+    def append(self, values: np.ndarray) -> None:
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self.part.write(values.tobytes())
+        self.rows += len(values)
+
+    def finish(self) -> None:
+        self.part.close()
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.rows,),
+        }
+        with open(self.path, "wb") as out, open(self.part_path, "rb") as src:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(src, out, 1 << 20)
+        self.part_path.unlink()
+
+
+def _encode_strings(column: pd.Series, vocab: Dict[str, int]) -> np.ndarray:
+    """Dictionary-encode a column against a vocabulary shared across files."""
+    values = column.astype(str).where(column.notna())
+    codes, uniques = pd.factorize(values)
+    mapping = np.array(
+        [vocab.setdefault(str(value), len(vocab)) for value in uniques] + [-1],
+        dtype=np.int32,
+    )
+    # Code -1 (missing) indexes the trailing -1
+    return mapping[codes]
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
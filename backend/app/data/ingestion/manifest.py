@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.vector_store import match_metadata, match_vector_id
+
+logger = logging.getLogger(__name__)
+
+
+# Where vectors went, and with which embedding model, before the manifest
+# recorded it; hashes for this target are computed as they always were, so
+# existing manifests stay valid
+DEFAULT_TARGET = "pinecone:tennis|text-embedding-3-small:1536"
+
+
+def match_content_hash(match: Dict, target: str = DEFAULT_TARGET) -> str:
+    """Hash of everything that ends up in a match's vector and metadata.
+
+    ``target`` names where the vector is stored and the model that embeds
+    it, so the same match bound for another index or model hashes
+    differently and is embedded again.
+    """
+    payload = json.dumps(match_metadata(match), sort_keys=True, default=str)
+    if target != DEFAULT_TARGET:
+        payload += "\n" + target
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class IngestionManifest:
+    """SQLite record of which match vectors are already in the index.
+
+    Rows are keyed by the deterministic vector ID and hold a hash of the
+    match's description and metadata. A run only embeds matches whose hash
+    is new or different, and each stored batch is committed straight away,
+    so an interrupted ingestion resumes where it stopped.
+
+    The hash covers the ``target`` index and embedding model too, so
+    switching vector backends, index locations or embedders re-embeds
+    every match instead of reporting the matches as already stored.
+    """
+
+    def __init__(self, path: str, target: str = DEFAULT_TARGET):
+        self.path = Path(path)
+        self.target = target
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vectors (
+                vector_id TEXT PRIMARY KEY,
+                match_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_vectors_updated ON vectors(updated_at)"
+        )
+        self.conn.commit()
+
+    @classmethod
+    def open_readonly(cls, path: str) -> Optional["IngestionManifest"]:
+        """Open an existing manifest without write access (None if missing).
+
+        Used by the API to follow what ingestion runs have changed.
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        manifest = cls.__new__(cls)
+        manifest.path = path
+        manifest.target = DEFAULT_TARGET
+        manifest.conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        return manifest
+
+    def known_hashes(self) -> Dict[str, str]:
+        """Map of vector ID to stored content hash."""
+        return dict(self.conn.execute("SELECT vector_id, content_hash FROM vectors"))
+
+    def pending(self, matches: Iterable[Dict]) -> List[Tuple[Dict, str, str]]:
+        """Return (match, vector_id, content_hash) for new or changed matches."""
+        return list(self.iter_pending(matches))
+
+    def iter_pending(
+        self, matches: Iterable[Dict], batch_size: int = 500
+    ) -> Iterator[Tuple[Dict, str, str]]:
+        """Lazily yield the new or changed matches from a stream.
+
+        Stored hashes are looked up one batch of IDs at a time, so memory
+        does not grow with the size of the manifest.
+        """
+        batch = []
+        for match in matches:
+            batch.append(
+                (
+                    match,
+                    match_vector_id(match),
+                    match_content_hash(match, self.target),
+                )
+            )
+            if len(batch) == batch_size:
+                yield from self._unstored(batch)
+                batch = []
+        if batch:
+            yield from self._unstored(batch)
+
+    def _unstored(self, batch: List[Tuple[Dict, str, str]]):
+        ids = [vector_id for _, vector_id, _ in batch]
+        known = dict(
+            self.conn.execute(
+                "SELECT vector_id, content_hash FROM vectors "
+                f"WHERE vector_id IN ({','.join('?' * len(ids))})",
+                ids,
+            )
+        )
+        return [entry for entry in batch if known.get(entry[1]) != entry[2]]
+
+    def checkpoint(self, entries: Iterable[Tuple[Dict, str, str]]) -> None:
+        """Record a stored batch in one transaction."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO vectors (vector_id, match_id, content_hash, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(vector_id) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    (vector_id, match["match_id"], content_hash, now)
+                    for match, vector_id, content_hash in entries
+                ],
+            )
+
+    def changed_since(
+        self, since: float, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """(match_id, updated_at) of vectors stored or re-stored after ``since``.
+
+        With ``limit`` this returns one page in ``updated_at`` order. A batch
+        shares one timestamp, so a full page is completed up to the end of
+        its last timestamp and the next page starts strictly after it.
+        """
+        if limit is None:
+            return self.conn.execute(
+                "SELECT match_id, updated_at FROM vectors WHERE updated_at > ? "
+                "ORDER BY updated_at",
+                (since,),
+            ).fetchall()
+        rows = self.conn.execute(
+            "SELECT match_id, updated_at FROM vectors WHERE updated_at > ? "
+            "ORDER BY updated_at LIMIT ?",
+            (since, limit),
+        ).fetchall()
+        if len(rows) < limit:
+            return rows
+        last = rows[-1][1]
+        return [row for row in rows if row[1] < last] + self.conn.execute(
+            "SELECT match_id, updated_at FROM vectors WHERE updated_at = ?", (last,)
+        ).fetchall()
+
+    def last_updated(self) -> float:
+        """Time of the most recent checkpoint (0 for an empty manifest)."""
+        value = self.conn.execute("SELECT MAX(updated_at) FROM vectors").fetchone()[0]
+        return value or 0.0
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def reset(self) -> None:
+        """Forget every stored vector so the next run re-embeds all matches."""
+        with self.conn:
+            self.conn.execute("DELETE FROM vectors")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class ManifestChangeFeed:
+    """Change feed of a manifest that may not exist yet.
+
+    The API can start before the first ingestion run, so the manifest is
+    opened read-only on first use and retried on every call until it
+    appears; until then there are no changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest: Optional[IngestionManifest] = None
+
+    def _open(self) -> Optional[IngestionManifest]:
+        if self.manifest is None:
+            self.manifest = IngestionManifest.open_readonly(self.path)
+        return self.manifest
+
+    def __call__(
+        self, since: float, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        manifest = self._open()
+        return [] if manifest is None else manifest.changed_since(since, limit)
+
+    def last_updated(self) -> float:
+        manifest = self._open()
+        return 0.0 if manifest is None else manifest.last_updated()
+
+    def close(self) -> None:
+        if self.manifest is not None:
+            self.manifest.close()
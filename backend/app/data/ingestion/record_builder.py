@@ -0,0 +1,293 @@
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Statistic columns carried on ingest records (see corpus_cache.STAT_COLUMNS)
+RECORD_STAT_COLUMNS = [
+    "winner_aces",
+    "winner_df",
+    "winner_svpt",
+    "winner_1stIn",
+    "winner_1stWon",
+    "winner_2ndWon",
+    "winner_SvGms",
+    "winner_bpSaved",
+    "winner_bpFaced",
+    "loser_aces",
+    "loser_df",
+    "loser_svpt",
+    "loser_1stIn",
+    "loser_1stWon",
+    "loser_2ndWon",
+    "loser_SvGms",
+    "loser_bpSaved",
+    "loser_bpFaced",
+]
+
+# Chunk of match columns: column name -> array of the chunk's values
+Columns = Dict[str, np.ndarray]
+
+
+def frame_chunks(df: pd.DataFrame, chunk_size: int = 10000) -> Iterator[Columns]:
+    """Split a match DataFrame into column-array chunks."""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        yield {col: chunk[col].to_numpy() for col in chunk.columns}
+
+
+def build_match_records(columns: Columns) -> List[Dict]:
+    """Build ingest match records for one chunk of cleaned columns.
+
+    String columns are object arrays (None for missing), ``tourney_date``
+    and ``match_num`` integers, and ranks and stats floats with NaN for
+    missing. Descriptions are built with whole-column string concatenation
+    and only the final dict assembly runs per row.
+    """
+    n = len(columns["winner_name"])
+    winner = _objects(columns["winner_name"])
+    loser = _objects(columns["loser_name"])
+    tourney = _objects(columns["tourney_name"])
+    surface = _objects(columns["surface"])
+    level = _objects(columns["tourney_level"])
+    round_ = _objects(columns["round"])
+    score = _objects(columns["score"])
+    date = _text(columns["tourney_date"])
+
+    description = (
+        winner
+        + " defeated "
+        + loser
+        + " \n        in the "
+        + round_
+        + " of "
+        + tourney
+        + " "
+        + date
+        + " \n        on "
+        + surface
+        + " courts with a score of "
+        + score
+        + ".\n        Tournament level: "
+        + level
+        + "."
+    )
+    if "winner_aces" in columns:
+        aces = np.asarray(columns["winner_aces"], dtype=np.float64)
+        has_aces = ~np.isnan(aces)
+        description[has_aces] = (
+            description[has_aces]
+            + "\n         "
+            + winner[has_aces]
+            + " served "
+            + aces[has_aces].astype(str)
+            + " aces."
+        )
+
+    match_num = (
+        _text(columns["match_num"])
+        if "match_num" in columns
+        else np.full(n, "0", dtype=object)
+    )
+    match_id = _objects(columns["tourney_id"]) + "_" + match_num
+
+    winner_id = _optional(columns, "winner_id", n)
+    loser_id = _optional(columns, "loser_id", n)
+    winner_rank = _optional_ints(columns, "winner_rank", n)
+    loser_rank = _optional_ints(columns, "loser_rank", n)
+
+    stat_cols = [col for col in RECORD_STAT_COLUMNS if col in columns]
+    stat_values = [_nullable(columns[col].astype(np.float64)) for col in stat_cols]
+    stat_rows = zip(*stat_values) if stat_values else ((),) * n
+
+    records = []
+    for i, stats in enumerate(stat_rows):
+        records.append(
+            {
+                "match_id": match_id[i],
+                "description": description[i],
+                "tournament": {
+                    "name": tourney[i],
+                    "date": date[i],
+                    "level": level[i],
+                    "surface": surface[i],
+                },
+                "players": {
+                    "winner": {
+                        "name": winner[i],
+                        "id": winner_id[i],
+                        "rank": winner_rank[i],
+                    },
+                    "loser": {
+                        "name": loser[i],
+                        "id": loser_id[i],
+                        "rank": loser_rank[i],
+                    },
+                },
+                "score": score[i],
+                "round": round_[i],
+                "stats": dict(zip(stat_cols, stats)),
+            }
+        )
+    return records
+
+
+def build_processed_records(
+    columns: Columns, surface_mapping: Dict[str, str], stat_columns: List[str]
+) -> List[Dict]:
+    """Build ``ATPDataProcessor`` records for one chunk of raw CSV columns.
+
+    Columns are taken as read from the CSV (NaN for missing values), with
+    lower-cased surfaces and only the stats present on each row.
+    """
+    n = len(columns["winner_name"])
+    winner = _text(columns["winner_name"])
+    loser = _text(columns["loser_name"])
+    date = _text(columns["tourney_date"])
+    year = pd.Series(date).str[:4].to_numpy(dtype=object)
+    match_id = _text(columns["tourney_id"]) + "_" + _text(columns["match_num"])
+    surface = (
+        pd.Series(columns["surface"], dtype=object)
+        .map(surface_mapping)
+        .fillna("unknown")
+        .to_numpy(dtype=object)
+    )
+
+    winner_rank = _nullable(columns["winner_rank"])
+    loser_rank = _nullable(columns["loser_rank"])
+    # A missing score would otherwise read "<NA>" in the description
+    score = pd.Series(columns["score"], dtype=object).fillna("").to_numpy(object)
+
+    description = (
+        winner
+        + " defeated "
+        + loser
+        + " in the "
+        + _text(columns["round"])
+        + " of "
+        + _text(columns["tourney_name"])
+        + " ("
+        + year
+        + ") on "
+        + surface
+        + " with a score of "
+        + score
+        + ". "
+    )
+
+    # Ranking context only when both ranks are known and non-zero
+    ranked = _truthy(columns["winner_rank"]) & _truthy(columns["loser_rank"])
+    description[ranked] = (
+        description[ranked]
+        + "At the time, "
+        + winner[ranked]
+        + " was ranked #"
+        + _text(columns["winner_rank"][ranked])
+        + " while "
+        + loser[ranked]
+        + " was #"
+        + _text(columns["loser_rank"][ranked])
+        + "."
+    )
+
+    stat_cols = [col for col in stat_columns if col in columns]
+    stat_values = [_nullable(columns[col]) for col in stat_cols]
+    stat_rows = zip(*stat_values) if stat_values else ((),) * n
+    # Rows with every stat present skip the per-value None filter
+    complete = np.ones(n, dtype=bool)
+    for col in stat_cols:
+        complete &= pd.notna(columns[col])
+    complete = complete.tolist()
+
+    tourney = columns["tourney_name"].tolist()
+    level = columns["tourney_level"].tolist()
+    winner_id = _ints(columns["winner_id"])
+    loser_id = _ints(columns["loser_id"])
+    score = score.tolist()
+    round_ = columns["round"].tolist()
+
+    records = []
+    for i, stats in enumerate(stat_rows):
+        records.append(
+            {
+                "match_id": match_id[i],
+                "tournament": {
+                    "name": tourney[i],
+                    "date": date[i],
+                    "surface": surface[i],
+                    "level": level[i],
+                },
+                "players": {
+                    "winner": {
+                        "name": winner[i],
+                        "id": winner_id[i],
+                        "rank": winner_rank[i],
+                    },
+                    "loser": {
+                        "name": loser[i],
+                        "id": loser_id[i],
+                        "rank": loser_rank[i],
+                    },
+                },
+                "score": score[i],
+                "stats": (
+                    dict(zip(stat_cols, stats))
+                    if complete[i]
+                    else {
+                        col: value
+                        for col, value in zip(stat_cols, stats)
+                        if value is not None
+                    }
+                ),
+                "round": round_[i],
+                "description": description[i],
+            }
+        )
+    return records
+
+
+def _objects(values: np.ndarray) -> np.ndarray:
+    return np.asarray(values, dtype=object)
+
+
+def _text(values: np.ndarray) -> np.ndarray:
+    """Column formatted as ``str(value)`` per cell, as an object array."""
+    return np.asarray(values).astype(str).astype(object)
+
+
+def _nullable(values: np.ndarray) -> List:
+    """Column as a Python list with None for missing values."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return np.where(np.isnan(values), None, values.astype(object)).tolist()
+    if values.dtype.kind in "iub":
+        return values.tolist()
+    series = pd.Series(values, dtype=object)
+    return series.where(series.notna(), None).tolist()
+
+
+def _ints(values: np.ndarray) -> List[Optional[int]]:
+    """Integer column as Python ints, with None for missing values."""
+    series = pd.Series(values)
+    missing = series.isna().to_numpy()
+    ints = series.fillna(0).astype("int64").tolist()
+    if not missing.any():
+        return ints
+    return [None if absent else value for value, absent in zip(ints, missing)]
+
+
+def _truthy(values: np.ndarray) -> np.ndarray:
+    series = pd.Series(values)
+    return (series.notna() & (series != 0)).to_numpy()
+
+
+def _optional(columns: Columns, col: str, n: int) -> List[Optional[object]]:
+    if col not in columns:
+        return [None] * n
+    return columns[col].tolist()
+
+
+def _optional_ints(columns: Columns, col: str, n: int) -> List[Optional[int]]:
+    if col not in columns:
+        return [None] * n
+    return [None if v != v else int(v) for v in columns[col].tolist()]
@@ -1,17 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from app.services.vector_store import TennisVectorStore
-from app.services.chat_service import TennisChatService
+from app.services.container import (
+    ServiceContainer,
+    get_container,
+    service_lifespan,
+)
+from app.services.metrics import REGISTRY, MetricsMiddleware, span
+import json
 import logging
 import os
+import time
 from dotenv import load_dotenv
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(lifespan=service_lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -24,39 +31,173 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+# Outermost, so request timings include CORS handling
+app.add_middleware(MetricsMiddleware)
 
 
 class QueryRequest(BaseModel):
     query: str
 
 
+def bypass_cache(http_request: Request) -> bool:
+    """Honour ``Cache-Control: no-cache`` from the client."""
+    return "no-cache" in http_request.headers.get("cache-control", "")
+
+
 @app.post("/api/query")
-async def query_tennis(request: QueryRequest):
+async def query_tennis(
+    request: QueryRequest,
+    http_request: Request,
+    http_response: Response,
+    container: ServiceContainer = Depends(get_container),
+):
     try:
-        logger.info(f"Received query: {request.query}")
+        logger.debug("Received query: %s", request.query)
 
-        vector_store = TennisVectorStore()
-        chat_service = TennisChatService()
+        vector_store = container.vector_store
+        chat_service = container.chat_service
+
+        # Repeated and near-duplicate questions skip retrieval and the LLM
+        with span("answer_cache"):
+            cached = await container.answer_cache.lookup(
+                request.query, bypass=bypass_cache(http_request)
+            )
+        http_response.headers.update(cached.headers())
+        if cached.payload is not None:
+            logger.debug("Answered from cache (%s)", cached.status)
+            return cached.payload
 
         # Get matches from vector store
         matches, analysis = await vector_store.search_matches(request.query, limit=10)
-        logger.info(f"Found {len(matches)} matches")
+        logger.debug("Found %d matches", len(matches))
 
         # Get AI analysis
         response = await chat_service.analyze_query(request.query, matches, analysis)
-        logger.info("Generated response")
+        logger.debug("Generated response")
 
-        return {"matches": matches, "analysis": analysis, "response": response}
+        payload = {"matches": matches, "analysis": analysis, "response": response}
+        await container.answer_cache.store(cached, payload)
+        return payload
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/api/query/stream")
+async def query_tennis_stream(
+    request: QueryRequest,
+    http_request: Request,
+    container: ServiceContainer = Depends(get_container),
+):
+    """Streaming variant of /api/query over Server-Sent Events.
+
+    Sends a ``matches`` event as soon as retrieval finishes, one ``token``
+    event per completion chunk, and a final ``done`` event with the full
+    response, its citations and stage timings (or an ``error`` event).
+    Cached answers are replayed as a single ``token`` event.
+    """
+    logger.debug("Received streaming query: %s", request.query)
+    with span("answer_cache"):
+        cached = await container.answer_cache.lookup(
+            request.query, bypass=bypass_cache(http_request)
+        )
+
+    async def replay(payload):
+        yield sse_event(
+            "matches", {"matches": payload["matches"], "analysis": payload["analysis"]}
+        )
+        yield sse_event("token", {"text": payload["response"]})
+        yield sse_event(
+            "done",
+            {
+                "response": payload["response"],
+                "citations": container.chat_service.extract_citations(
+                    payload["response"], payload["matches"]
+                ),
+                "timing": {"retrieval_ms": 0.0, "first_token_ms": 0.0, "total_ms": 0.0},
+            },
+        )
+
+    async def events():
+        started = time.perf_counter()
+        try:
+            matches, analysis = await container.vector_store.search_matches(
+                request.query, limit=10
+            )
+            retrieved = time.perf_counter()
+            yield sse_event("matches", {"matches": matches, "analysis": analysis})
+
+            chat_service = container.chat_service
+            parts = []
+            first_token = None
+            async for token in chat_service.stream_analysis(
+                request.query, matches, analysis
+            ):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(token)
+                yield sse_event("token", {"text": token})
+
+            finished = time.perf_counter()
+            response = "".join(parts)
+            await container.answer_cache.store(
+                cached,
+                {"matches": matches, "analysis": analysis, "response": response},
+            )
+            yield sse_event(
+                "done",
+                {
+                    "response": response,
+                    "citations": chat_service.extract_citations(response, matches),
+                    "timing": {
+                        "retrieval_ms": round((retrieved - started) * 1000, 1),
+                        "first_token_ms": round(
+                            ((first_token or finished) - started) * 1000, 1
+                        ),
+                        "total_ms": round((finished - started) * 1000, 1),
+                    },
+                },
+            )
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events() if cached.payload is None else replay(cached.payload),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            **cached.headers(),
+        },
+    )
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/pool-stats")
+async def pool_stats(container: ServiceContainer = Depends(get_container)):
+    return container.pool_stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: request and stage latency, bytes, tokens."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # Load environment variables
 load_dotenv()
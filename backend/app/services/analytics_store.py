@@ -0,0 +1,266 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import logging
+import sqlite3
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Corpus columns the aggregates are computed from
+ANALYTICS_COLUMNS = [
+    "winner_name",
+    "loser_name",
+    "tourney_name",
+    "surface",
+    "tourney_level",
+    "round",
+    "tourney_date",
+]
+
+
+def build_analytics(frames: Union[pd.DataFrame, Iterable[pd.DataFrame]], path: str):
+    """Aggregate the full ATP match data into the analytics database.
+
+    ``frames`` is the match frame or an iterable of consecutive chunks of
+    it. Chunks are aggregated as they arrive, so memory follows the number
+    of players and tournaments rather than matches. Writes head-to-head
+    counts per player pair and surface, win/loss records per player and
+    tournament and per player and surface, and the list of titles (finals
+    won). The database is built next to ``path`` and swapped in atomically.
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    h2h = player_tournament = player_surface = None
+    titles = []
+    for frame in frames:
+        df = pd.DataFrame(
+            {
+                "winner": frame["winner_name"].astype(str),
+                "loser": frame["loser_name"].astype(str),
+                "tournament": frame["tourney_name"].astype(str),
+                "surface": frame["surface"].astype(str),
+                "level": frame["tourney_level"].astype(str),
+                "round": frame["round"].astype(str),
+                "year": frame["tourney_date"].astype(str).str[:4].astype(int),
+            }
+        )
+        h2h = _accumulate(h2h, _head_to_head(df))
+        player_tournament = _accumulate(player_tournament, _win_loss(df, "tournament"))
+        player_surface = _accumulate(player_surface, _win_loss(df, "surface"))
+        titles.append(
+            df.loc[
+                df["round"] == "F", ["winner", "tournament", "year", "level", "surface"]
+            ].rename(columns={"winner": "player"})
+        )
+    if h2h is None:
+        raise ValueError("No matches to aggregate")
+
+    h2h = h2h.astype(int).reset_index()
+    h2h["b_wins"] = h2h["matches"] - h2h["a_wins"]
+    player_tournament = player_tournament.astype(int).reset_index()
+    player_surface = player_surface.astype(int).reset_index()
+    titles = pd.concat(titles, ignore_index=True)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+
+    conn = sqlite3.connect(str(tmp))
+    with conn:
+        conn.executescript(_SCHEMA)
+        conn.executemany(
+            "INSERT INTO head_to_head VALUES (?, ?, ?, ?, ?)",
+            h2h[["player_a", "player_b", "surface", "a_wins", "b_wins"]].itertuples(
+                index=False
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO player_tournament VALUES (?, ?, ?, ?)",
+            player_tournament.itertuples(index=False),
+        )
+        conn.executemany(
+            "INSERT INTO player_surface VALUES (?, ?, ?, ?)",
+            player_surface.itertuples(index=False),
+        )
+        conn.executemany(
+            "INSERT INTO titles VALUES (?, ?, ?, ?, ?)",
+            titles.itertuples(index=False),
+        )
+    conn.close()
+    tmp.replace(path)
+    logger.info(
+        f"Built analytics store: {len(h2h):,} head-to-head rows, "
+        f"{len(titles):,} titles"
+    )
+
+
+def _head_to_head(df: pd.DataFrame) -> pd.DataFrame:
+    # Keyed on the alphabetically ordered pair
+    a_first = df["winner"] <= df["loser"]
+    h2h = pd.DataFrame(
+        {
+            "player_a": df["winner"].where(a_first, df["loser"]),
+            "player_b": df["loser"].where(a_first, df["winner"]),
+            "surface": df["surface"],
+            "a_won": a_first.astype(int),
+        }
+    )
+    return h2h.groupby(["player_a", "player_b", "surface"])["a_won"].agg(
+        a_wins="sum", matches="count"
+    )
+
+
+def _win_loss(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    wins = df.groupby(["winner", key]).size().rename("wins")
+    losses = df.groupby(["loser", key]).size().rename("losses")
+    wins.index.names = losses.index.names = ["player", key]
+    return pd.concat([wins, losses], axis=1).fillna(0)
+
+
+def _accumulate(total: Optional[pd.DataFrame], part: pd.DataFrame) -> pd.DataFrame:
+    return part if total is None else total.add(part, fill_value=0)
+
+
+_SCHEMA = """
+CREATE TABLE head_to_head (
+    player_a TEXT, player_b TEXT, surface TEXT, a_wins INTEGER, b_wins INTEGER,
+    PRIMARY KEY (player_a, player_b, surface)
+) WITHOUT ROWID;
+CREATE TABLE player_tournament (
+    player TEXT, tournament TEXT, wins INTEGER, losses INTEGER,
+    PRIMARY KEY (player, tournament)
+) WITHOUT ROWID;
+CREATE TABLE player_surface (
+    player TEXT, surface TEXT, wins INTEGER, losses INTEGER,
+    PRIMARY KEY (player, surface)
+) WITHOUT ROWID;
+CREATE TABLE titles (
+    player TEXT, tournament TEXT, year INTEGER, level TEXT, surface TEXT
+);
+CREATE INDEX idx_titles_player ON titles (player, tournament);
+CREATE INDEX idx_titles_tournament ON titles (tournament, year);
+"""
+
+
+class TennisAnalyticsStore:
+    """Read side of the precomputed analytics database.
+
+    Every lookup is a primary-key or index probe, so the query path gets
+    full-career head-to-head, tournament and surface records without
+    aggregating retrieved matches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TennisAnalyticsStore"]:
+        """Open the store, or return None when it has not been built."""
+        if not Path(path).exists():
+            return None
+        return cls(path)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; open read-only ones lazily
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def head_to_head(self, player: str, opponent: str) -> Dict:
+        a, b = sorted([player, opponent])
+        rows = self.conn.execute(
+            "SELECT surface, a_wins, b_wins FROM head_to_head "
+            "WHERE player_a = ? AND player_b = ?",
+            (a, b),
+        ).fetchall()
+        by_surface = {
+            surface: {a: a_wins, b: b_wins} for surface, a_wins, b_wins in rows
+        }
+        return {
+            a: sum(row[1] for row in rows),
+            b: sum(row[2] for row in rows),
+            "by_surface": by_surface,
+        }
+
+    def tournament_record(self, player: str, tournament: str) -> Dict:
+        row = self.conn.execute(
+            "SELECT wins, losses FROM player_tournament "
+            "WHERE player = ? AND tournament = ?",
+            (player, tournament),
+        ).fetchone()
+        wins, losses = row or (0, 0)
+        return {
+            "wins": wins,
+            "losses": losses,
+            "titles": self.titles(player, tournament),
+        }
+
+    def surface_record(self, player: str, surface: str) -> Dict:
+        row = self.conn.execute(
+            "SELECT wins, losses FROM player_surface WHERE player = ? AND surface = ?",
+            (player, surface),
+        ).fetchone()
+        wins, losses = row or (0, 0)
+        return {"wins": wins, "losses": losses}
+
+    def titles(self, player: str, tournament: Optional[str] = None) -> List[int]:
+        if tournament is None:
+            rows = self.conn.execute(
+                "SELECT year FROM titles WHERE player = ? ORDER BY year", (player,)
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT year FROM titles WHERE player = ? AND tournament = ? "
+                "ORDER BY year",
+                (player, tournament),
+            )
+        return [row[0] for row in rows]
+
+    def match_counts(self) -> Dict[str, int]:
+        """Career match count of every player in the store."""
+        return dict(
+            self.conn.execute(
+                "SELECT player, SUM(wins + losses) FROM player_surface GROUP BY player"
+            )
+        )
+
+    def analysis_for(self, matches: Iterable[Dict]) -> Dict:
+        """Career records for the players, events and pairs in ``matches``."""
+        tournament_wins: Dict[str, Dict] = {}
+        surface_wins: Dict[str, Dict] = {}
+        head_to_head: Dict[str, Dict] = {}
+        pairs: set[Tuple[str, str]] = set()
+
+        for match in matches:
+            winner = match["winner_name"]
+            loser = match["loser_name"]
+            tournament = match["tournament_name"]
+            surface = match["surface"]
+
+            for player in (winner, loser):
+                records = tournament_wins.setdefault(player, {})
+                if tournament not in records:
+                    records[tournament] = self.tournament_record(player, tournament)
+                records = surface_wins.setdefault(player, {})
+                if surface not in records:
+                    records[surface] = self.surface_record(player, surface)
+
+            pair = tuple(sorted([winner, loser]))
+            if pair not in pairs:
+                pairs.add(pair)
+                head_to_head[f"{pair[0]} vs {pair[1]}"] = self.head_to_head(*pair)
+
+        return {
+            "tournament_wins": tournament_wins,
+            "surface_wins": surface_wins,
+            "head_to_head": head_to_head,
+        }
@@ -0,0 +1,364 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from .embedder import Embedder
+from .embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Parsed-query fields that identify what a question is about and what it
+# asks ("who won" and "who lost" the same final are different questions)
+KEY_FIELDS = ("tournament", "years", "round", "players", "asks", "query_type")
+
+
+def answer_key(parsed: Dict) -> str:
+    """Canonical cache key for a parsed query."""
+    key = {}
+    for field in KEY_FIELDS:
+        value = parsed.get(field)
+        if value:
+            key[field] = (
+                sorted(str(v).lower() for v in value)
+                if isinstance(value, (list, tuple, set))
+                else str(value).lower()
+            )
+    return json.dumps(key, sort_keys=True)
+
+
+def _tourney_id(match_id: str) -> str:
+    # Match IDs are "<tourney_id>_<match_num>", tourney IDs "<year>-<code>"
+    return match_id.rsplit("_", 1)[0]
+
+
+class CachedAnswer:
+    """A generated answer with what it was built from."""
+
+    __slots__ = (
+        "query",
+        "key",
+        "vector",
+        "payload",
+        "tourneys",
+        "years",
+        "created",
+        "expires",
+    )
+
+    def __init__(
+        self,
+        query: str,
+        key: str,
+        vector: Optional[np.ndarray],
+        payload: Dict,
+        tourneys: Set[str],
+        years: Set[int],
+        expires: Optional[float],
+    ):
+        self.query = query
+        self.key = key
+        self.vector = vector
+        self.payload = payload
+        self.tourneys = tourneys
+        self.years = years
+        self.created = time.time()
+        self.expires = expires
+
+    def depends_on(self, tourney_id: str) -> bool:
+        """Whether a stored or updated match could change this answer."""
+        if tourney_id in self.tourneys:
+            return True
+        # Open-ended questions (careers, records) may involve any match
+        if not self.years:
+            return True
+        year = tourney_id[:4]
+        return year.isdigit() and int(year) in self.years
+
+
+class AnswerLookup:
+    """Result of an answer cache lookup."""
+
+    def __init__(
+        self,
+        status: str,
+        answer: Optional[CachedAnswer] = None,
+        similarity: Optional[float] = None,
+        key: str = "",
+        text: str = "",
+        vector: Optional[np.ndarray] = None,
+    ):
+        self.status = status  # "hit", "similar", "miss" or "bypass"
+        self.answer = answer
+        self.similarity = similarity
+        self.key = key
+        self.text = text
+        self.vector = vector
+
+    @property
+    def payload(self) -> Optional[Dict]:
+        return None if self.answer is None else self.answer.payload
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"X-Answer-Cache": self.status}
+        if self.answer is not None:
+            headers["X-Answer-Cache-Age"] = str(int(time.time() - self.answer.created))
+        if self.similarity is not None:
+            headers["X-Answer-Cache-Similarity"] = f"{self.similarity:.3f}"
+        return headers
+
+
+class AnswerCache:
+    """LRU/TTL cache of complete query answers.
+
+    Answers are grouped by the normalized parsed query: tournament, years,
+    round and players, plus what the question asks (winner, loser or
+    score) and its query type. A question with the same normalized text is
+    a direct hit; otherwise the closest cached question in the same group
+    by query embedding is reused when it is similar enough. Questions in
+    different groups never share answers, so neither "Wimbledon 2018
+    winner" nor "who lost the Wimbledon 2019 final" can answer "who won
+    the Wimbledon 2019 final" however close their embeddings are. Within a
+    fully specified group (tournament, years and round all known) the
+    key pins down the match, so ``key_similarity`` can be looser than the
+    ``similarity`` open-ended questions need; it still has to reject
+    questions about other details of the same match, such as aces.
+
+    Entries remember the tournaments and years of the matches they were
+    built from and are dropped when an ingestion run stores or updates a
+    match they depend on, as reported by ``changes(since, limit)``. The
+    change feed is read in pages of ``change_page_size`` on a worker thread
+    by a background task, so lookups never wait on it.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        parse_query: Callable[[str], Dict],
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = 3600,
+        similarity: float = 0.92,
+        key_similarity: float = 0.8,
+        changes: Optional[Callable[[float, int], List]] = None,
+        watermark: float = 0.0,
+        check_interval: float = 30.0,
+        change_page_size: int = 5000,
+    ):
+        self.embedder = embedder
+        self.parse_query = parse_query
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.key_similarity = key_similarity
+        self.changes = changes
+        self.watermark = watermark
+        self.check_interval = check_interval
+        self.change_page_size = change_page_size
+        self._checked = time.monotonic()
+        self._change_task: Optional[asyncio.Task] = None
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._groups: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    async def lookup(self, query: str, bypass: bool = False) -> AnswerLookup:
+        """Find a cached answer for ``query``.
+
+        The returned lookup also carries the parsed key and query embedding
+        so ``store`` does not have to compute them again.
+        """
+        text = normalize_query(query)
+        parsed = self.parse_query(query)
+        key = answer_key(parsed)
+        if not self.enabled or bypass:
+            return AnswerLookup("bypass", key=key, text=text)
+
+        self._check_changes()
+        entry = self._live(text)
+        if entry is not None:
+            self.hits += 1
+            return AnswerLookup("hit", entry, key=key, text=text)
+
+        candidates = [
+            entry
+            for entry in map(self._live, list(self._groups.get(key, ())))
+            if entry is not None and entry.vector is not None
+        ]
+        vector = None
+        if candidates:
+            vector = await self._embed(text)
+            scores = np.stack([entry.vector for entry in candidates]) @ vector
+            best = int(np.argmax(scores))
+            threshold = (
+                self.key_similarity
+                if {"tournament", "years", "round"} <= set(parsed)
+                else self.similarity
+            )
+            if scores[best] >= threshold:
+                self.similar_hits += 1
+                self._entries.move_to_end(candidates[best].query)
+                return AnswerLookup(
+                    "similar",
+                    candidates[best],
+                    similarity=float(scores[best]),
+                    key=key,
+                    text=text,
+                    vector=vector,
+                )
+
+        self.misses += 1
+        return AnswerLookup("miss", key=key, text=text, vector=vector)
+
+    async def store(self, lookup: AnswerLookup, payload: Dict):
+        """Cache the answer built after a missed ``lookup``."""
+        if not self.enabled or not payload.get("response"):
+            return
+        vector = lookup.vector
+        if vector is None:
+            vector = await self._embed(lookup.text)
+
+        matches = payload.get("matches", [])
+        tourneys = {_tourney_id(m["match_id"]) for m in matches if m.get("match_id")}
+        years = {int(m["year"]) for m in matches if m.get("year")}
+        years.update(int(year) for year in json.loads(lookup.key).get("years", []))
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+
+        self._remove(lookup.text)
+        self._entries[lookup.text] = CachedAnswer(
+            lookup.text, lookup.key, vector, payload, tourneys, years, expires
+        )
+        self._groups.setdefault(lookup.key, set()).add(lookup.text)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, match_ids: List[str]) -> int:
+        """Drop answers that depend on any of the given matches."""
+        tourney_ids = {_tourney_id(match_id) for match_id in match_ids}
+        stale = [
+            text
+            for text, entry in self._entries.items()
+            if any(entry.depends_on(tourney_id) for tourney_id in tourney_ids)
+        ]
+        for text in stale:
+            self._remove(text)
+        self.invalidated += len(stale)
+        return len(stale)
+
+    def clear(self):
+        self.invalidated += len(self._entries)
+        self._entries.clear()
+        self._groups.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.similar_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "hit_rate": (
+                round((self.hits + self.similar_hits) / lookups, 3) if lookups else 0.0
+            ),
+        }
+
+    def _live(self, text: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get(text)
+        if entry is None:
+            return None
+        if entry.expires is not None and entry.expires <= time.monotonic():
+            self._remove(text)
+            return None
+        self._entries.move_to_end(text)
+        return entry
+
+    def _remove(self, text: str):
+        entry = self._entries.pop(text, None)
+        if entry is None:
+            return
+        group = self._groups.get(entry.key)
+        if group is not None:
+            group.discard(text)
+            if not group:
+                del self._groups[entry.key]
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(await self.embedder.embed_query(text), np.float32)
+        except Exception as e:
+            logger.warning(f"Answer cache could not embed query: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_changes(self):
+        """Start applying ingestion changes at most once per ``check_interval``."""
+        if self.changes is None:
+            return
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        if self._change_task is not None and not self._change_task.done():
+            return
+        self._checked = now
+        self._change_task = asyncio.get_running_loop().create_task(
+            self._apply_changes()
+        )
+
+    async def _apply_changes(self):
+        # Pages are read off the event loop and applied on it between
+        # reads, so a full re-ingest never holds up requests
+        changed = dropped = 0
+        while True:
+            try:
+                page = await asyncio.to_thread(
+                    self.changes, self.watermark, self.change_page_size
+                )
+            except Exception as e:
+                logger.warning(f"Could not read ingestion changes: {str(e)}")
+                break
+            if not page:
+                break
+            self.watermark = page[-1][1]
+            changed += len(page)
+            dropped += self.invalidate([match_id for match_id, _ in page])
+        if changed:
+            logger.info(
+                f"Ingestion changed {changed:,} matches; "
+                f"dropped {dropped} cached answers"
+            )
+
+
+def create_answer_cache(
+    embedder: Embedder, parse_query: Callable[[str], Dict], manifest=None
+) -> AnswerCache:
+    """Build the answer cache from environment settings.
+
+    ``manifest`` is the ingestion change feed (if any) used for
+    invalidation: a callable returning changes since a timestamp, with a
+    ``last_updated()`` method.
+    """
+    ttl = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")) or None
+    return AnswerCache(
+        embedder,
+        parse_query,
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+        ttl_seconds=ttl,
+        similarity=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92")),
+        key_similarity=float(os.getenv("ANSWER_CACHE_KEY_SIMILARITY", "0.8")),
+        changes=manifest,
+        watermark=manifest.last_updated() if manifest is not None else 0.0,
+        check_interval=float(os.getenv("ANSWER_CACHE_CHECK_SECONDS", "30")),
+    )
@@ -1,42 +1,158 @@
 from openai import AsyncOpenAI
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional
 import json
+import logging
+import os
+import re
+import time
+
+from .context_builder import ContextBuilder, TokenCounter
+from .embedding_cache import normalize_query
+from .metrics import LLM_TOKENS, observe_stage, span
+from .query_parser import QueryParser
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4-1106-preview"
 
 
 class TennisChatService:
-    def __init__(self):
-        self.openai = AsyncOpenAI()
+    def __init__(
+        self,
+        openai_client: Optional[AsyncOpenAI] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        parser: Optional[QueryParser] = None,
+    ):
+        self.openai = openai_client or AsyncOpenAI()
+        self.parser = parser or QueryParser()
+        self.context_builder = context_builder or ContextBuilder(
+            TokenCounter(MODEL),
+            max_tokens=int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "1500")),
+        )
+        # Savings over the raw JSON context are measured on one request in
+        # ``savings_sample`` (and on every request with debug logging),
+        # since serializing and tokenizing the JSON is hot-path work
+        self.savings_sample = int(os.getenv("CHAT_CONTEXT_SAVINGS_SAMPLE", "100"))
+        self.context_stats = {
+            "requests": 0,
+            "context_tokens": 0,
+            "sampled": 0,
+            "tokens_saved": 0,
+        }
+        self.temperature = 0
+        self.max_tokens = 500
+        # Concurrent identical generations share one completion call
+        self.generation_flights = SingleFlight("generation")
 
     def _classify_query(self, query: str) -> str:
         """Classify the type of tennis query."""
-        query = query.lower()
-
-        if any(
-            word in query
-            for word in ["stats", "statistics", "average", "most", "least"]
-        ):
-            return "statistical"
-        elif any(word in query for word in ["head to head", "versus", "vs", "against"]):
-            return "head_to_head"
-        elif any(
-            tournament in query
-            for tournament in [
-                "french open",
-                "roland garros",
-                "wimbledon",
-                "us open",
-                "australian open",
-            ]
-        ):
-            return "tournament"
-        elif any(surface in query for surface in ["clay", "grass", "hard"]):
-            return "surface"
-        else:
-            return "general"
+        return self.parser.parse(query)["query_type"]
 
     async def analyze_query(
-        self, query: str, matches: List[Dict], analysis: Dict
+        self,
+        query: str,
+        matches: List[Dict],
+        analysis: Dict,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
     ) -> str:
+        temperature = self.temperature if temperature is None else temperature
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        # Same question over the same matches with the same parameters
+        key = (
+            normalize_query(query),
+            tuple(match.get("match_id") for match in matches),
+            MODEL,
+            temperature,
+            max_tokens,
+        )
+
+        async def generate() -> str:
+            request = self._completion_request(
+                query, matches, analysis, temperature, max_tokens
+            )
+            with span("llm"):
+                response = await self.openai.chat.completions.create(**request)
+            if response.usage is not None:
+                LLM_TOKENS.inc(response.usage.prompt_tokens, model=MODEL, kind="prompt")
+                LLM_TOKENS.inc(
+                    response.usage.completion_tokens, model=MODEL, kind="completion"
+                )
+            return response.choices[0].message.content
+
+        return await self.generation_flights.do(key, generate)
+
+    async def stream_analysis(
+        self,
+        query: str,
+        matches: List[Dict],
+        analysis: Dict,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the analysis text as the completion streams in.
+
+        Streamed responses carry no usage, so prompt tokens are counted
+        locally and each content chunk is counted as one completion token.
+        """
+        request = self._completion_request(
+            query,
+            matches,
+            analysis,
+            self.temperature if temperature is None else temperature,
+            self.max_tokens if max_tokens is None else max_tokens,
+        )
+        counter = self.context_builder.counter
+        LLM_TOKENS.inc(
+            sum(counter.count(message["content"]) for message in request["messages"]),
+            model=MODEL,
+            kind="prompt",
+        )
+        started = time.perf_counter()
+        first_token = True
+        with span("llm"):
+            stream = await self.openai.chat.completions.create(**request, stream=True)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    if first_token:
+                        observe_stage("llm_first_token", time.perf_counter() - started)
+                        first_token = False
+                    LLM_TOKENS.inc(model=MODEL, kind="completion")
+                    yield content
+
+    def extract_citations(self, text: str, matches: List[Dict]) -> List[Dict]:
+        """Matches referenced by ``[n]`` markers in a response (1-based)."""
+        citations = []
+        for n in sorted({int(n) for n in re.findall(r"\[(\d+)\]", text)}):
+            if not 1 <= n <= len(matches):
+                continue
+            match = matches[n - 1]
+            citations.append(
+                {
+                    "id": n,
+                    "match_id": match.get("match_id"),
+                    "winner": match.get("winner_name"),
+                    "loser": match.get("loser_name"),
+                    "tournament": match.get("tournament_name"),
+                    "year": match.get("year"),
+                    "round": match.get("round"),
+                    "score": match.get("score"),
+                }
+            )
+        return citations
+
+    def _completion_request(
+        self,
+        query: str,
+        matches: List[Dict],
+        analysis: Dict,
+        temperature: float,
+        max_tokens: int,
+    ) -> Dict:
         system_prompt = """You are a tennis expert providing accurate, engaging answers to tennis queries.
 
 IMPORTANT CITATION RULES:
@@ -73,27 +189,56 @@ For general/statistical queries:
 - Focus on historical facts and records
 - Don't reference or qualify the data source"""
 
+        context = self._build_context(query, matches, analysis)
         user_message = f"""Query: {query}
 
-Available match data and statistics:
-{json.dumps(matches, indent=2)}  # Only send relevant matches
-
-Additional statistics:
-{json.dumps(analysis, indent=2)}
+Available match data and statistics (cite matches by their [n]):
+{context}
 
 Provide a response with proper citations and numbered format for multi-part answers."""
 
-        response = await self.openai.chat.completions.create(
-            model="gpt-4-1106-preview",
-            messages=[
+        return {
+            "model": MODEL,
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_message},
             ],
-            temperature=0,
-            max_tokens=500,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+    def _build_context(self, query: str, matches: List[Dict], analysis: Dict) -> str:
+        """Compact match context, sampling the tokens saved over raw JSON."""
+        context, report = self.context_builder.build(
+            matches, analysis, self._classify_query(query)
         )
+        self.context_stats["requests"] += 1
+        self.context_stats["context_tokens"] += report["context_tokens"]
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if not debug and (
+            self.savings_sample <= 0
+            or self.context_stats["requests"] % self.savings_sample
+        ):
+            return context
 
-        return response.choices[0].message.content
+        counter = self.context_builder.counter
+        legacy_tokens = counter.count(json.dumps(matches, indent=2)) + counter.count(
+            json.dumps(analysis, indent=2, default=str)
+        )
+        saved = legacy_tokens - report["context_tokens"]
+        self.context_stats["sampled"] += 1
+        self.context_stats["tokens_saved"] += saved
+        logger.debug(
+            "Prompt context: %d tokens (%s, %d matches, %d dropped), "
+            "%d saved vs %d as JSON",
+            report["context_tokens"],
+            report["query_type"],
+            report["matches_included"],
+            report["matches_dropped"],
+            saved,
+            legacy_tokens,
+        )
+        return context
 
     def generate_response(self, query: str) -> str:
         """Generate response using RAG and LLM."""
@@ -0,0 +1,220 @@
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import FastAPI, Request
+from openai import AsyncOpenAI
+import httpx
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+from .embedder import Embedder, create_embedder
+from .local_index import LocalVectorIndex
+from .match_lookup import MatchLookupTable
+from .lexical_index import LexicalIndex
+from .reranker import create_reranker
+from .analytics_store import TennisAnalyticsStore
+from .embedding_cache import CachedEmbedder, create_query_embedding_cache
+from .answer_cache import create_answer_cache
+from .query_parser import create_query_parser
+from app.data.ingestion.manifest import ManifestChangeFeed
+from .vector_store import TennisVectorStore, create_index
+from .chat_service import TennisChatService
+from .rag_service import TennisRAGService
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Process-lifetime holder for the API clients shared by every request.
+
+    One container is created per worker when the app starts. The Pinecone
+    index handle and the OpenAI HTTP pool are built once here and handed to
+    the services, so requests reuse warm connections instead of paying for
+    client setup and TLS handshakes each time.
+    """
+
+    def __init__(
+        self,
+        openai_client: Optional[AsyncOpenAI] = None,
+        index=None,
+        embedder: Optional[Embedder] = None,
+    ):
+        self.created_at = time.time()
+        self.requests_served = 0
+
+        if openai_client is None:
+            max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+            openai_client = AsyncOpenAI(
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections // 5 or 1,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                )
+            )
+        self.openai = openai_client
+
+        if index is None:
+            index = create_index(
+                pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4"))
+            )
+        self.index = index
+
+        self.embedding_cache = create_query_embedding_cache()
+        self.embedder = CachedEmbedder(
+            embedder or create_embedder(self.openai), self.embedding_cache
+        )
+        # Keyed tables and career aggregates written by the ingest script
+        self.lookup = MatchLookupTable.load(
+            os.getenv("MATCH_LOOKUP_PATH", "data/match_lookup.json.gz")
+        )
+        self.analytics = TennisAnalyticsStore.load(
+            os.getenv("ANALYTICS_PATH", "data/analytics.sqlite")
+        )
+        self.lexical = LexicalIndex.load(
+            os.getenv("LEXICAL_INDEX_PATH", "data/lexical_index")
+        )
+        # Player names are ranked by career matches to resolve bare surnames
+        self.parser = create_query_parser(
+            os.getenv("ATP_DATA_PATH", "tennis_atp"),
+            self.analytics.match_counts() if self.analytics else None,
+        )
+        self.vector_store = TennisVectorStore(
+            index=self.index,
+            embedder=self.embedder,
+            lookup=self.lookup,
+            analytics=self.analytics,
+            parser=self.parser,
+            lexical=self.lexical,
+            reranker=create_reranker(),
+        )
+        self.chat_service = TennisChatService(
+            openai_client=self.openai, parser=self.parser
+        )
+        # Answers are invalidated from the ingestion manifest's change feed,
+        # which is picked up once the first ingestion run creates it
+        self.manifest = ManifestChangeFeed(
+            os.getenv("INGEST_MANIFEST_PATH", "tennis_atp/.ingest_manifest.sqlite")
+        )
+        self.answer_cache = create_answer_cache(
+            self.embedder, self.parser.parse, self.manifest
+        )
+        self.rag_service = TennisRAGService(
+            vector_store=self.vector_store, llm=self.openai
+        )
+
+    async def start(self):
+        """Warm up anything that should not be paid for by the first request."""
+        started = time.perf_counter()
+        await self.embedder.warm()
+        logger.info(
+            f"Embedder {self.embedder.model_name} ready in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        if self.vector_store.reranker is not None:
+            await self.vector_store.reranker.warm()
+
+    def mark_request(self):
+        """Count a request served by the shared clients."""
+        self.requests_served += 1
+
+    async def aclose(self):
+        """Close the shared connection pools."""
+        self.vector_store.close()
+        await self.embedding_cache.close()
+        self.manifest.close()
+        try:
+            await self.openai.close()
+        except Exception as e:
+            logger.warning(f"Error closing OpenAI client: {str(e)}")
+
+        api_client = getattr(self.index, "_api_client", None)
+        if api_client is not None:
+            try:
+                api_client.close()
+            except Exception as e:
+                logger.warning(f"Error closing Pinecone client: {str(e)}")
+
+    def pool_stats(self) -> Dict:
+        """Report connection reuse for the shared clients."""
+        return {
+            "uptime_seconds": round(time.time() - self.created_at, 1),
+            "requests_served": self.requests_served,
+            "embedder": self.embedder.model_name,
+            "embedding_cache": self.embedding_cache.stats(),
+            "answer_cache": self.answer_cache.stats(),
+            "chat_context": self.chat_service.context_stats,
+            "lexical_index": self.lexical.stats() if self.lexical else None,
+            "reranker": (
+                self.vector_store.reranker.stats()
+                if self.vector_store.reranker
+                else None
+            ),
+            "coalescing": {
+                flights.name: flights.stats()
+                for flights in (
+                    self.embedder.flights,
+                    self.vector_store.search_flights,
+                    self.chat_service.generation_flights,
+                )
+            },
+            "openai": self._openai_pool_stats(),
+            "pinecone": self._pinecone_pool_stats(),
+        }
+
+    def _openai_pool_stats(self) -> Dict:
+        # httpx does not expose pool state publicly, so read it best-effort
+        http_client = getattr(self.openai, "_client", None)
+        transport = getattr(http_client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "client_id": id(self.openai),
+            "connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+        }
+
+    def _pinecone_pool_stats(self) -> Dict:
+        if isinstance(self.index, LocalVectorIndex):
+            return {"client_id": id(self.index), "local": True}
+        api_client = getattr(self.index, "_api_client", None)
+        rest_client = getattr(api_client, "rest_client", None)
+        pool_manager = getattr(rest_client, "pool_manager", None)
+        pools = getattr(pool_manager, "pools", None)
+
+        stats = {"client_id": id(self.index), "hosts": 0, "connections": 0}
+        if pools is None:
+            return stats
+
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["hosts"] += 1
+            stats["connections"] += getattr(pool, "num_connections", 0)
+        return stats
+
+
+@asynccontextmanager
+async def service_lifespan(app: FastAPI):
+    """Create the service container on startup and close it on shutdown."""
+    container = ServiceContainer()
+    await container.start()
+    app.state.container = container
+    logger.info("Service container started")
+    try:
+        yield
+    finally:
+        await container.aclose()
+        logger.info("Service container closed")
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """FastAPI dependency returning the worker's service container."""
+    container = request.app.state.container
+    container.mark_request()
+    return container
@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Match columns shown to the model, in table order
+MATCH_COLUMNS = [
+    ("year", "year"),
+    ("tournament_name", "tournament"),
+    ("tournament_level", "level"),
+    ("surface", "surface"),
+    ("round", "round"),
+    ("winner_name", "winner"),
+    ("loser_name", "loser"),
+    ("score", "score"),
+]
+STAT_COLUMNS = [
+    ("winner_aces", "w_aces"),
+    ("winner_df", "w_df"),
+    ("loser_aces", "l_aces"),
+    ("loser_df", "l_df"),
+]
+
+# Analysis sections worth their tokens for each _classify_query type, most
+# relevant first; the rest are dropped
+ANALYSIS_SECTIONS = {
+    "head_to_head": ["head_to_head"],
+    "tournament": ["tournament_wins"],
+    "surface": ["surface_wins"],
+    "statistical": ["tournament_wins", "surface_wins", "head_to_head"],
+    "general": ["head_to_head", "tournament_wins", "surface_wins"],
+}
+
+# BPE splits words into pieces of roughly four characters
+_APPROX_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+class TokenCounter:
+    """Count prompt tokens with tiktoken, or estimate them without it."""
+
+    def __init__(self, model: str = "gpt-4"):
+        try:
+            import tiktoken
+        except ImportError:
+            logger.info("tiktoken not installed; estimating prompt token counts")
+            self.encoding = None
+            return
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return len(_APPROX_TOKEN.findall(text))
+
+
+class ContextBuilder:
+    """Compact, token-budgeted match context for the chat prompt.
+
+    Matches become one numbered table row each (the number is what the
+    model cites), descriptions and IDs are left out because the columns
+    already carry them, and columns with the same value on every row are
+    stated once above the table. Per-match stats are only kept for
+    statistical questions and analysis sections only for the query types
+    they answer. If the context is still over ``max_tokens``, analysis
+    sections and then the lowest-ranked rows are dropped.
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None, max_tokens: int = 1500):
+        self.counter = counter or TokenCounter()
+        self.max_tokens = max_tokens
+
+    def build(
+        self, matches: List[Dict], analysis: Dict, query_type: str = "general"
+    ) -> Tuple[str, Dict]:
+        """Return the context text and a report of the tokens it used."""
+        columns = list(MATCH_COLUMNS)
+        if query_type == "statistical":
+            columns += STAT_COLUMNS
+        shared, varying = self._split_columns(matches, columns)
+
+        header = []
+        if shared:
+            header.append(
+                "All matches: "
+                + ", ".join(f"{label}={value}" for label, value in shared)
+            )
+        header.append("n | " + " | ".join(label for _, label in varying))
+        rows = [
+            f"[{i}] | " + " | ".join(_cell(match.get(field)) for field, _ in varying)
+            for i, match in enumerate(matches, 1)
+        ]
+
+        sections = [
+            (name, analysis[name])
+            for name in ANALYSIS_SECTIONS.get(query_type, ANALYSIS_SECTIONS["general"])
+            if analysis.get(name)
+        ]
+        extra = []
+        if "total_matches" in analysis:
+            extra.append(f"total_matches={analysis['total_matches']}")
+
+        # Drop the least relevant analysis, then the lowest-ranked rows
+        text = self._render(header, rows, sections, extra)
+        tokens = self.counter.count(text)
+        while tokens > self.max_tokens and (sections or len(rows) > 1):
+            if sections:
+                sections.pop()
+            else:
+                rows.pop()
+            text = self._render(header, rows, sections, extra)
+            tokens = self.counter.count(text)
+
+        return text, {
+            "query_type": query_type,
+            "context_tokens": tokens,
+            "matches_included": len(rows),
+            "matches_dropped": len(matches) - len(rows),
+            "analysis_sections": [name for name, _ in sections],
+            "exact_count": self.counter.exact,
+        }
+
+    @staticmethod
+    def _split_columns(matches: List[Dict], columns: List[Tuple[str, str]]):
+        shared, varying = [], []
+        for field, label in columns:
+            values = {_cell(match.get(field)) for match in matches}
+            if len(matches) > 1 and len(values) == 1:
+                shared.append((label, values.pop()))
+            else:
+                varying.append((field, label))
+        return shared, varying
+
+    @staticmethod
+    def _render(header: List[str], rows: List[str], sections, extra) -> str:
+        lines = ["Matches:"] + header + rows
+        if sections or extra:
+            lines.append("")
+            lines.append("Additional statistics:")
+            lines.extend(
+                f"{name}: {json.dumps(value, separators=(',', ':'), default=str)}"
+                for name, value in sections
+            )
+            lines.extend(extra)
+        return "\n".join(lines)
+
+
+def _cell(value) -> str:
+    if value is None or value != value:
+        return "-"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).replace("|", "/")
@@ -0,0 +1,218 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from openai import AsyncOpenAI
+import asyncio
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from .metrics import EMBEDDING_TOKENS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder:
+    """Turns text into embedding vectors.
+
+    ``remote`` embedders call a rate-limited API, so the ingestion pipeline
+    applies its token budget to them; local ones are bounded by CPU only.
+    """
+
+    model_name: str = ""
+    dimension: Optional[int] = None
+    remote: bool = True
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    async def embed_query(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+
+    async def warm(self):
+        """Load whatever the embedder needs before the first request."""
+
+    def close(self):
+        pass
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI API."""
+
+    def __init__(
+        self,
+        openai_client: Optional[AsyncOpenAI] = None,
+        model_name: str = "text-embedding-3-small",
+        dimension: int = 1536,
+    ):
+        self.openai = openai_client or AsyncOpenAI()
+        self.model_name = model_name
+        self.dimension = dimension
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.openai.embeddings.create(
+            model=self.model_name,
+            input=texts,
+        )
+        if response.usage is not None:
+            EMBEDDING_TOKENS.inc(response.usage.total_tokens, model=self.model_name)
+        return [item.embedding for item in response.data]
+
+
+class LocalEmbedder(Embedder):
+    """Sentence-transformers model running on local CPU threads.
+
+    The model is loaded once (``warm``) and shared by a thread pool, so
+    large ingestion batches are split across cores. Single queries are
+    collected for up to ``max_wait_ms`` and encoded together, which keeps
+    per-query latency in the low milliseconds under concurrent load.
+    """
+
+    remote = False
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        backend: str = "torch",
+        quantize: bool = False,
+        threads: Optional[int] = None,
+        batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="local-embedder"
+        )
+        self.model = None
+        self._load_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def _load(self):
+        with self._load_lock:
+            if self.model is None:
+                self._load_model()
+
+    def _load_model(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The local embedding backend needs sentence-transformers: "
+                "pip install sentence-transformers"
+            ) from e
+
+        started = time.perf_counter()
+        kwargs = {"device": "cpu"}
+        if self.backend != "torch":
+            kwargs["backend"] = self.backend
+        model = SentenceTransformer(self.model_name, **kwargs)
+
+        if self.quantize and self.backend == "torch":
+            import torch
+
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+        self.dimension = model.get_sentence_embedding_dimension()
+        self.model = model
+        logger.info(
+            f"Loaded {self.model_name} ({self.backend}, "
+            f"{'int8' if self.quantize else 'fp32'}, dim {self.dimension}) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).tolist()
+
+    async def warm(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._load)
+        # First call pays for kernel and allocator warm-up
+        await loop.run_in_executor(self.executor, self._encode, ["warm up"])
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if self.model is None:
+            await self.warm()
+
+        loop = asyncio.get_running_loop()
+        chunks = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, self._encode, c) for c in chunks)
+        )
+        return [vector for chunk in results for vector in chunk]
+
+    async def embed_query(self, text: str) -> List[float]:
+        if self.model is None:
+            await self.warm()
+        if self._batcher is None or self._batcher.done():
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._batch_queries())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _batch_queries(self):
+        """Group concurrent single queries into one encode call."""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in pending]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self._encode, texts)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), vector in zip(pending, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+        self.executor.shutdown(wait=False)
+
+
+def create_embedder(openai_client: Optional[AsyncOpenAI] = None) -> Embedder:
+    """Build the embedder selected by ``EMBEDDING_BACKEND`` (openai/local)."""
+    backend = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+    if backend == "local":
+        return LocalEmbedder(
+            model_name=os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+            backend=os.getenv("LOCAL_EMBEDDING_RUNTIME", "torch"),
+            quantize=os.getenv("LOCAL_EMBEDDING_INT8", "false").lower() == "true",
+            threads=int(os.getenv("LOCAL_EMBEDDING_THREADS", "0")) or None,
+        )
+    if backend != "openai":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    return OpenAIEmbedder(openai_client)
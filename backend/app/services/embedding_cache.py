@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import logging
+import os
+import re
+import time
+
+import numpy as np
+
+from .embedder import Embedder
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for cache keys."""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.rstrip("?!. ")
+
+
+class RedisEmbeddingBackend:
+    """Shared embedding cache in Redis so every worker sees the same entries."""
+
+    def __init__(self, url: str, ttl_seconds: Optional[int] = None):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "The shared embedding cache needs redis: pip install redis"
+            ) from e
+        self.client = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        value = await self.client.get(f"qemb:{key}")
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float32).tolist()
+
+    async def set(self, key: str, vector: List[float]):
+        await self.client.set(
+            f"qemb:{key}",
+            np.asarray(vector, dtype=np.float32).tobytes(),
+            ex=self.ttl_seconds,
+        )
+
+    async def close(self):
+        await self.client.close()
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings with optional TTL.
+
+    Keys combine the embedding model with the normalized query text. A
+    shared backend (Redis) can sit behind the in-process LRU so workers
+    reuse each other's embeddings.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = None,
+        shared=None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, query: str) -> str:
+        normalized = normalize_query(query)
+        return hashlib.sha1(f"{model_name}\n{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            vector, expires = entry
+            if expires is None or expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            del self._entries[key]
+
+        if self.shared is not None:
+            try:
+                vector = await self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared embedding cache unavailable: {str(e)}")
+                vector = None
+            if vector is not None:
+                self.shared_hits += 1
+                self._store(key, vector)
+                return vector
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, vector: List[float]):
+        self._store(key, vector)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, vector)
+            except Exception as e:
+                logger.warning(f"Shared embedding cache unavailable: {str(e)}")
+
+    def _store(self, key: str, vector: List[float]):
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (vector, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0
+            ),
+        }
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.close()
+
+
+class CachedEmbedder(Embedder):
+    """Embedder wrapper that answers repeated queries from the cache."""
+
+    def __init__(self, embedder: Embedder, cache: QueryEmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        # Concurrent misses for the same query share one embedding call
+        self.flights = SingleFlight("embedding")
+
+    @property
+    def model_name(self) -> str:
+        return self.embedder.model_name
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.embedder.dimension
+
+    @property
+    def remote(self) -> bool:
+        return self.embedder.remote
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedder.embed(texts)
+
+    async def embed_query(self, text: str) -> List[float]:
+        key = self.cache.key(self.model_name, text)
+        vector = await self.cache.get(key)
+        if vector is None:
+            vector = await self.flights.do(key, lambda: self._embed_miss(key, text))
+        return vector
+
+    async def _embed_miss(self, key: str, text: str) -> List[float]:
+        vector = await self.embedder.embed_query(text)
+        await self.cache.set(key, vector)
+        return vector
+
+    async def warm(self):
+        await self.embedder.warm()
+
+    def close(self):
+        self.embedder.close()
+
+
+def create_query_embedding_cache() -> QueryEmbeddingCache:
+    """Build the query embedding cache from environment settings."""
+    ttl = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "0")) or None
+    redis_url = os.getenv("EMBEDDING_CACHE_REDIS_URL")
+    shared = (
+        RedisEmbeddingBackend(redis_url, int(ttl) if ttl else None)
+        if redis_url
+        else None
+    )
+    return QueryEmbeddingCache(
+        max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+        ttl_seconds=ttl,
+        shared=shared,
+    )
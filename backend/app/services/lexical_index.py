@@ -0,0 +1,276 @@
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import json
+import logging
+import math
+import re
+import time
+import unicodedata
+
+import numpy as np
+
+from .local_index import ScoredVector, _matches_filter
+from .match_table import MatchTable, MatchTableBuilder
+from .metadata_index import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+# Set scores ("7-6(1)") are kept whole so an exact score is one rare term
+_TERM = re.compile(r"\d+-\d+(?:\(\d+\))?|[a-z0-9]+")
+
+# Terms in more than this share of documents barely move BM25 scores
+# ("defeated", "courts"), so their long posting lists are not decoded
+MAX_DF_RATIO = 0.5
+
+
+def terms(text: str) -> List[str]:
+    """Lower-case ASCII search terms (accents folded, set scores kept whole)."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _TERM.findall(text.lower())
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """LEB128-encode non-negative integers: 7 bits per byte, high bit = more."""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(nbytes) - nbytes
+    position = np.arange(int(nbytes.sum())) - np.repeat(starts, nbytes)
+    shifted = np.repeat(values, nbytes) >> (np.uint64(7) * position.astype(np.uint64))
+    more = position < np.repeat(nbytes, nbytes) - 1
+    return (
+        (shifted & np.uint64(0x7F)) | (more.astype(np.uint64) << np.uint64(7))
+    ).astype(np.uint8)
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Inverse of ``encode_varints``."""
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0:1] = 0
+    starts[1:] = ends[:-1] + 1
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    values = (data & 0x7F).astype(np.int64) << (7 * position)
+    return np.add.reduceat(values, starts) if len(starts) else values
+
+
+class LexicalIndex:
+    """BM25 inverted index over match descriptions.
+
+    Built at ingest next to the lookup table. Each term's posting list is
+    its document ids, delta-encoded and packed as varints (most gaps fit
+    in one byte), with term frequencies in a parallel uint8 array. Lists
+    are decoded with numpy at query time, so names and exact scores
+    ("Djokovic 7-6(1) 6-7(10)") are resolved by touching only their own
+    postings. Filters use the same Pinecone-style syntax as the vector
+    index.
+    """
+
+    def __init__(
+        self,
+        metadata: MatchTable,
+        vocabulary: List[str],
+        posting_starts: np.ndarray,
+        byte_starts: np.ndarray,
+        doc_gaps: np.ndarray,
+        frequencies: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.metadata = metadata
+        self.vocabulary = vocabulary
+        self.term_ids = {term: i for i, term in enumerate(vocabulary)}
+        self.posting_starts = posting_starts
+        self.byte_starts = byte_starts
+        self.doc_gaps = doc_gaps
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.size = len(doc_lengths)
+        self.avg_length = float(doc_lengths.mean()) if self.size else 0.0
+        self.k1 = k1
+        self.b = b
+        self.metadata_index = MetadataIndex(metadata)
+
+    @classmethod
+    def build(cls, records: Iterable[Dict]) -> "LexicalIndex":
+        """Index flattened match metadata (``match_metadata`` records).
+
+        Records are consumed as a stream; a ``MatchTable`` that already
+        holds them is shared as the index's metadata instead of copied.
+        """
+        started = time.perf_counter()
+        shared = records if isinstance(records, MatchTable) else None
+        builder = MatchTableBuilder()
+        term_ids: Dict[str, int] = {}
+        # Postings are collected in document order, so each term's ids
+        # come out sorted once grouped by term
+        posting_terms, posting_docs, posting_tfs = array("I"), array("I"), array("B")
+        doc_lengths = array("H")
+
+        for doc, record in enumerate(records):
+            if shared is None:
+                builder.add(record)
+            tokens = terms(_document_text(record))
+            doc_lengths.append(min(len(tokens), 0xFFFF))
+            for term, tf in Counter(tokens).items():
+                posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+                posting_docs.append(doc)
+                posting_tfs.append(min(tf, 0xFF))
+
+        by_term = np.frombuffer(posting_terms, dtype=np.uint32)
+        order = np.argsort(by_term, kind="stable")
+        by_term = by_term[order]
+        docs = np.frombuffer(posting_docs, dtype=np.uint32)[order].astype(np.int64)
+        posting_starts = np.searchsorted(by_term, np.arange(len(term_ids) + 1))
+
+        gaps = docs.copy()
+        gaps[1:] -= docs[:-1]
+        first = posting_starts[:-1][np.diff(posting_starts) > 0]
+        gaps[first] = docs[first]
+        doc_gaps = encode_varints(gaps)
+        # Byte offset of each term's list: varints end on bytes < 0x80
+        ends = np.flatnonzero(doc_gaps < 0x80)
+        byte_starts = np.concatenate(([0], ends + 1))[posting_starts]
+
+        index = cls(
+            shared if shared is not None else builder.finish(),
+            list(term_ids),
+            posting_starts.astype(np.int64),
+            byte_starts.astype(np.int64),
+            doc_gaps,
+            np.frombuffer(posting_tfs, dtype=np.uint8)[order],
+            np.frombuffer(doc_lengths, dtype=np.uint16),
+        )
+        stats = index.stats()
+        logger.info(
+            f"Built lexical index: {stats['documents']:,} documents, "
+            f"{stats['terms']:,} terms, {stats['postings']:,} postings at "
+            f"{stats['bytes_per_posting']} bytes each in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+        return index
+
+    def __len__(self) -> int:
+        return self.size
+
+    def search(
+        self, query: str, top_k: int = 10, filter: Optional[Dict] = None
+    ) -> List[ScoredVector]:
+        """Top ``top_k`` documents by BM25 score for ``query``.
+
+        Results are keyed by ``match_id``, not by vector id.
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(terms(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.posting_starts[term_id], self.posting_starts[term_id + 1]
+            df = int(end - start)
+            if df > self.size * MAX_DF_RATIO:
+                continue
+            docs = np.cumsum(
+                decode_varints(
+                    self.doc_gaps[
+                        self.byte_starts[term_id] : self.byte_starts[term_id + 1]
+                    ]
+                )
+            )
+            tf = self.frequencies[start:end].astype(np.float32)
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (
+                1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length
+            )
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        hits = np.flatnonzero(scores)
+        if filter and len(hits):
+            if self.metadata_index.supports(filter):
+                hits = hits[self.metadata_index.evaluate(filter)[hits]]
+            else:
+                hits = np.array(
+                    [
+                        row
+                        for row in hits
+                        if _matches_filter(self.metadata[int(row)], filter)
+                    ],
+                    dtype=np.int64,
+                )
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [
+            ScoredVector(row["match_id"], float(scores[i]), row)
+            for i, row in ((int(i), self.metadata[int(i)]) for i in hits)
+        ]
+
+    def stats(self) -> Dict:
+        postings = len(self.frequencies)
+        posting_bytes = len(self.doc_gaps) + self.frequencies.nbytes
+        return {
+            "documents": self.size,
+            "terms": len(self.vocabulary),
+            "postings": postings,
+            "posting_bytes": posting_bytes,
+            "bytes_per_posting": round(posting_bytes / postings, 2) if postings else 0,
+        }
+
+    # Persistence
+
+    def save(self, path: str):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self.metadata.save(path / "metadata")
+        for name in (
+            "posting_starts",
+            "byte_starts",
+            "doc_gaps",
+            "frequencies",
+            "doc_lengths",
+        ):
+            np.save(path / f"{name}.npy", getattr(self, name))
+        with open(path / "index.json", "w") as f:
+            json.dump({"k1": self.k1, "b": self.b, "vocabulary": self.vocabulary}, f)
+        logger.info(f"Saved lexical index ({self.size:,} documents) to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        """Load a saved index, or return None when none has been built."""
+        path = Path(path)
+        if not (path / "index.json").exists():
+            return None
+        started = time.perf_counter()
+        with open(path / "index.json") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r")
+            for name in ("posting_starts", "byte_starts", "doc_gaps", "frequencies")
+        }
+        index = cls(
+            MatchTable.load(path / "metadata"),
+            meta["vocabulary"],
+            doc_lengths=np.load(path / "doc_lengths.npy"),
+            k1=meta["k1"],
+            b=meta["b"],
+            **arrays,
+        )
+        logger.info(
+            f"Loaded lexical index ({index.size:,} documents) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return index
+
+
+def _document_text(record: Dict) -> str:
+    text = record.get("description") or " ".join(
+        str(record.get(field) or "")
+        for field in ("winner_name", "loser_name", "tournament_name", "round", "score")
+    )
+    # Descriptions only carry the full date, so add the year as a term
+    return f"{text} {record.get('year', '')}"
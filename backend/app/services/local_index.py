@@ -0,0 +1,526 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from .match_table import MatchRow, MatchTable
+from .metadata_index import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+
+class ScoredVector:
+    __slots__ = ("id", "score", "metadata")
+
+    def __init__(self, id: str, score: float, metadata: Optional[Dict]):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class QueryResponse:
+    __slots__ = ("matches",)
+
+    def __init__(self, matches: List[ScoredVector]):
+        self.matches = matches
+
+
+class LocalVectorIndex:
+    """Embedded cosine-similarity index with the Pinecone ``Index`` API.
+
+    Compacted vectors live in one memory-mapped ``.npy`` array, ordered by
+    inverted-file (IVF) list so each probed list is a contiguous slice. A
+    query scores only the ``nprobe`` lists nearest to the query vector and
+    falls back to exact brute force for small indexes, ``exact=True`` or
+    filters the probed lists cannot satisfy. Filters on indexed metadata
+    fields are resolved first through a :class:`MetadataIndex`, and small
+    candidate sets are searched exactly.
+
+    Upserts are appended to a write-ahead log and searched exactly until
+    ``save()`` compacts them into the IVF layout, so an ingestion run can
+    be interrupted at any batch without losing stored vectors.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dtype: str = "float32",
+        nprobe: int = 8,
+        exact_threshold: int = 20000,
+    ):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.dimension: Optional[int] = None
+        # Embedding model the stored vectors came from
+        self.model: Optional[str] = None
+
+        # Compacted rows (memory-mapped after load)
+        self.ids: List[str] = []
+        self.metadata = MatchTable()
+        self.vectors = np.zeros((0, 0), dtype=self.dtype)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.centroids: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+
+        # Rows upserted since the last compaction
+        self.tail_ids: List[str] = []
+        self.tail_metadata: List[Dict] = []
+        self.tail_vectors: List[np.ndarray] = []
+        self._tail_matrix: Optional[np.ndarray] = None
+        # Vectors in wal.f32 that a wal.jsonl record points at
+        self._wal_rows = 0
+
+        self.metadata_index = MetadataIndex([])
+        self.id_to_row: Dict[str, int] = {}
+        self.tail_rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LocalVectorIndex":
+        """Open an index directory, replaying any uncompacted upserts."""
+        index = cls(path, **kwargs)
+        meta_path = index.path / "index.json"
+        if meta_path.exists():
+            started = time.perf_counter()
+            with open(meta_path) as f:
+                meta = json.load(f)
+            index.dimension = meta["dimension"]
+            index.model = meta.get("model")
+            index.dtype = np.dtype(meta["dtype"])
+            index.vectors = np.load(index.path / "vectors.npy", mmap_mode="r")
+            with open(index.path / "ids.json") as f:
+                index.ids = json.load(f)
+            if (index.path / "metadata").is_dir():
+                index.metadata = MatchTable.load(index.path / "metadata")
+            else:
+                # Version 1 layout: one JSON record per line
+                with open(index.path / "metadata.jsonl") as f:
+                    index.metadata = MatchTable.from_records(
+                        json.loads(line) for line in f
+                    )
+            if (index.path / "centroids.npy").exists():
+                index.centroids = np.load(index.path / "centroids.npy")
+                index.list_offsets = np.load(index.path / "list_offsets.npy")
+            index.deleted = np.zeros(len(index.ids), dtype=bool)
+            index.id_to_row = {vid: row for row, vid in enumerate(index.ids)}
+            index.metadata_index = MetadataIndex(index.metadata)
+            logger.info(
+                f"Loaded local index with {len(index.ids):,} vectors "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        index._replay_wal()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids) - int(self.deleted.sum()) + len(self.tail_ids)
+
+    def bind_model(self, model: str):
+        """Record the embedding model, or refuse one that differs from the
+        model the stored vectors came from."""
+        if self.model is None:
+            self.model = model
+        elif self.model != model:
+            raise ValueError(
+                f"Local index at {self.path} holds {self.model} vectors, not "
+                f"{model}; delete it or set LOCAL_INDEX_PATH to a new directory "
+                f"and ingest again"
+            )
+
+    def describe_index_stats(self) -> Dict:
+        return {
+            "dimension": self.dimension,
+            "total_vector_count": len(self),
+            "uncompacted_vector_count": len(self.tail_ids),
+            "ivf_lists": 0 if self.centroids is None else len(self.centroids),
+        }
+
+    # Writes
+
+    def upsert(self, vectors: List[Dict], **kwargs):
+        """Insert or overwrite vectors; durable once this returns."""
+        if not vectors:
+            return {"upserted_count": 0}
+
+        values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        values = _normalize(values)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = values.shape[1]
+            elif values.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Vector dimension {values.shape[1]} does not match "
+                    f"index dimension {self.dimension}"
+                )
+            self._append_wal(vectors, values)
+            self._apply(vectors, values)
+        return {"upserted_count": len(vectors)}
+
+    def _apply(self, vectors: List[Dict], values: np.ndarray):
+        for item, vector in zip(vectors, values):
+            vector_id = item["id"]
+            row = self.id_to_row.get(vector_id)
+            if row is not None:
+                self.deleted[row] = True
+            tail_row = self.tail_rows.get(vector_id)
+            if tail_row is not None:
+                self.tail_vectors[tail_row] = vector
+                self.tail_metadata[tail_row] = item.get("metadata") or {}
+            else:
+                self.tail_rows[vector_id] = len(self.tail_ids)
+                self.tail_ids.append(vector_id)
+                self.tail_vectors.append(vector)
+                self.tail_metadata.append(item.get("metadata") or {})
+        self._tail_matrix = None
+
+    def _append_wal(self, vectors: List[Dict], values: np.ndarray):
+        self.path.mkdir(parents=True, exist_ok=True)
+        header = self.path / "wal.json"
+        if not header.exists():
+            with open(header, "w") as f:
+                json.dump({"dimension": self.dimension, "model": self.model}, f)
+        # Each record names its vector's row in wal.f32, so vectors left
+        # behind by a crash before their records were written are never
+        # paired with later records
+        records = "".join(
+            json.dumps(
+                {
+                    "id": v["id"],
+                    "metadata": v.get("metadata") or {},
+                    "row": self._wal_rows + i,
+                }
+            )
+            + "\n"
+            for i, v in enumerate(vectors)
+        )
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        with open(self.path / "wal.f32", "ab") as f:
+            f.truncate(self._wal_rows * row_bytes)
+            f.write(values.astype(np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.path / "wal.jsonl", "a") as f:
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        self._wal_rows += len(vectors)
+
+    def _replay_wal(self):
+        header = self.path / "wal.json"
+        records_path = self.path / "wal.jsonl"
+        vectors_path = self.path / "wal.f32"
+        if not header.exists() or not records_path.exists():
+            return
+        with open(header) as f:
+            wal = json.load(f)
+        self.dimension = wal["dimension"]
+        self.model = self.model or wal.get("model")
+        raw = np.fromfile(vectors_path, dtype=np.float32)
+        available = raw.size // self.dimension
+        records, good_bytes = [], 0
+        with open(records_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final write
+                # Version 1 records are positional
+                if record.setdefault("row", len(records)) >= available:
+                    break
+                records.append(record)
+                good_bytes += len(line)
+
+        # Drop a torn record and any vectors no record points at, so the
+        # next append starts from a consistent log
+        with open(records_path, "r+b") as f:
+            f.truncate(good_bytes)
+        self._wal_rows = records[-1]["row"] + 1 if records else 0
+        with open(vectors_path, "r+b") as f:
+            f.truncate(self._wal_rows * self.dimension * raw.itemsize)
+        if not records:
+            return
+
+        values = raw[: self._wal_rows * self.dimension].reshape(-1, self.dimension)
+        if self.deleted.size != len(self.ids):
+            self.deleted = np.zeros(len(self.ids), dtype=bool)
+        self._apply(
+            [{"id": r["id"], "metadata": r["metadata"]} for r in records],
+            values[[r["row"] for r in records]],
+        )
+        logger.info(
+            f"Replayed {len(records):,} uncompacted vectors from the write-ahead log"
+        )
+
+    def save(self, nlist: Optional[int] = None):
+        """Compact all vectors into a fresh IVF layout on disk."""
+        with self._lock:
+            keep = np.flatnonzero(~self.deleted)
+            ids = [self.ids[i] for i in keep] + self.tail_ids
+            metadata = self.metadata.records(keep.tolist()) + self.tail_metadata
+            parts = []
+            if len(keep):
+                parts.append(np.asarray(self.vectors[keep], dtype=np.float32))
+            if self.tail_vectors:
+                parts.append(np.vstack(self.tail_vectors))
+            if not parts:
+                return
+            vectors = np.vstack(parts)
+
+            centroids, list_offsets, order = None, None, None
+            if len(ids) > self.exact_threshold:
+                centroids, assignments = _train_ivf(
+                    vectors, nlist or int(np.sqrt(len(ids)))
+                )
+                order = np.argsort(assignments, kind="stable")
+                counts = np.bincount(assignments, minlength=len(centroids))
+                list_offsets = np.concatenate([[0], np.cumsum(counts)])
+                vectors = vectors[order]
+                ids = [ids[i] for i in order]
+                metadata = [metadata[i] for i in order]
+
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            if tmp.exists():
+                shutil.rmtree(tmp)
+            tmp.mkdir(parents=True)
+            np.save(tmp / "vectors.npy", vectors.astype(self.dtype))
+            with open(tmp / "ids.json", "w") as f:
+                json.dump(ids, f)
+            metadata = MatchTable.from_records(metadata)
+            metadata.save(tmp / "metadata")
+            if centroids is not None:
+                np.save(tmp / "centroids.npy", centroids)
+                np.save(tmp / "list_offsets.npy", list_offsets)
+            with open(tmp / "index.json", "w") as f:
+                json.dump(
+                    {
+                        "version": INDEX_VERSION,
+                        "dimension": self.dimension,
+                        "model": self.model,
+                        "dtype": self.dtype.name,
+                        "count": len(ids),
+                    },
+                    f,
+                )
+
+            old = self.path.with_name(self.path.name + ".old")
+            if self.path.exists():
+                self.path.rename(old)
+            tmp.rename(self.path)
+            if old.exists():
+                shutil.rmtree(old)
+
+            self.ids = ids
+            self.metadata = metadata
+            self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+            self.deleted = np.zeros(len(ids), dtype=bool)
+            self.centroids = centroids
+            self.list_offsets = list_offsets
+            self.id_to_row = {vid: row for row, vid in enumerate(ids)}
+            self.metadata_index = MetadataIndex(metadata)
+            self.tail_ids, self.tail_metadata, self.tail_vectors = [], [], []
+            self.tail_rows = {}
+            self._tail_matrix = None
+            self._wal_rows = 0
+            logger.info(
+                f"Compacted local index: {len(ids):,} vectors, "
+                f"{0 if centroids is None else len(centroids)} IVF lists"
+            )
+
+    # Reads
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        include_metadata: bool = True,
+        filter: Optional[Dict] = None,
+        exact: bool = False,
+        **kwargs,
+    ) -> QueryResponse:
+        q = _normalize(np.asarray(vector, dtype=np.float32)[None, :])[0]
+
+        rows, scores = self._search_main(q, filter, exact)
+        if filter and not exact and len(rows) < top_k and self.centroids is not None:
+            # The probed lists could not satisfy the filter; search everything
+            rows, scores = self._search_main(q, filter, exact=True)
+
+        candidates = [
+            (float(score), self.ids[row], self.metadata[row])
+            for row, score in zip(*_top_k(rows, scores, top_k))
+        ]
+        candidates.extend(self._search_tail(q, filter, top_k))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        # Compacted rows come back as lazy views over the match table; only
+        # the returned tail records are copied
+        return QueryResponse(
+            [
+                ScoredVector(
+                    vector_id,
+                    score,
+                    (
+                        (meta if isinstance(meta, MatchRow) else dict(meta))
+                        if include_metadata
+                        else None
+                    ),
+                )
+                for score, vector_id, meta in candidates[:top_k]
+            ]
+        )
+
+    def _search_main(self, q: np.ndarray, filter: Optional[Dict], exact: bool):
+        if not len(self.ids):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        allowed = ~self.deleted
+        if filter and self.metadata_index.supports(filter):
+            # Pre-filter: only rows satisfying the filter are ever scored
+            allowed &= self.metadata_index.evaluate(filter)
+            candidates = np.flatnonzero(allowed)
+            if (
+                exact
+                or self.centroids is None
+                or len(candidates) <= self.exact_threshold
+            ):
+                return candidates, _dot(self.vectors[candidates], q)
+            filter = None
+
+        if exact or self.centroids is None:
+            rows = np.arange(len(self.ids))
+            scores = _dot(self.vectors, q)
+        else:
+            probe = np.argsort(self.centroids @ q)[-self.nprobe :]
+            rows = np.concatenate(
+                [
+                    np.arange(self.list_offsets[l], self.list_offsets[l + 1])
+                    for l in probe
+                ]
+            )
+            scores = np.concatenate(
+                [
+                    _dot(
+                        self.vectors[self.list_offsets[l] : self.list_offsets[l + 1]], q
+                    )
+                    for l in probe
+                ]
+            )
+
+        keep = allowed[rows]
+        if filter:
+            # Conditions on fields without an inverted index
+            keep &= np.fromiter(
+                (_matches_filter(self.metadata[row], filter) for row in rows),
+                dtype=bool,
+                count=len(rows),
+            )
+        return rows[keep], scores[keep]
+
+    def _search_tail(self, q: np.ndarray, filter: Optional[Dict], top_k: int):
+        # Queries run on a thread pool; snapshot the tail so a concurrent
+        # upsert or compaction cannot change it mid-search
+        with self._lock:
+            if not self.tail_ids:
+                return []
+            if self._tail_matrix is None:
+                self._tail_matrix = np.vstack(self.tail_vectors)
+            matrix = self._tail_matrix
+            ids = self.tail_ids[: len(matrix)]
+            metadata = self.tail_metadata[: len(matrix)]
+        rows = np.arange(len(matrix))
+        scores = matrix @ q
+        if filter:
+            keep = np.fromiter(
+                (_matches_filter(meta, filter) for meta in metadata),
+                dtype=bool,
+                count=len(rows),
+            )
+            rows, scores = rows[keep], scores[keep]
+        return [
+            (float(score), ids[row], metadata[row])
+            for row, score in zip(*_top_k(rows, scores, top_k))
+        ]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _dot(vectors: np.ndarray, q: np.ndarray) -> np.ndarray:
+    if vectors.dtype != np.float32:
+        vectors = vectors.astype(np.float32)
+    return vectors @ q
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int):
+    if len(scores) > k:
+        best = np.argpartition(scores, -k)[-k:]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores)
+    return rows[order], scores[order]
+
+
+def _train_ivf(vectors: np.ndarray, nlist: int, iterations: int = 10):
+    """Spherical k-means on a sample, then assign every vector to a list."""
+    rng = np.random.default_rng(0)
+    nlist = max(1, min(nlist, len(vectors)))
+    sample_size = min(len(vectors), nlist * 64)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        sums[empty] = centroids[empty]
+        centroids = _normalize(sums)
+
+    assignments = np.concatenate(
+        [
+            np.argmax(vectors[i : i + 8192] @ centroids.T, axis=1)
+            for i in range(0, len(vectors), 8192)
+        ]
+    )
+    return centroids.astype(np.float32), assignments
+
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+}
+
+
+def _matches_filter(metadata: Dict, filter: Dict) -> bool:
+    """Evaluate a Pinecone-style metadata filter against one record."""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, arg in condition.items():
+                if not _OPERATORS[op](value, arg):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import gzip
+import json
+import logging
+import time
+
+from .match_table import MatchRow, MatchTable
+from .vector_store import match_metadata
+
+logger = logging.getLogger(__name__)
+
+
+class MatchLookupTable:
+    """Keyed match tables for questions that name one exact result.
+
+    Built at ingest from the same flattened metadata that goes into the
+    vector index. ``(tournament, year, round)`` maps to the matching rows,
+    and player names (lower-cased) map to every match they won or lost,
+    so fully specified queries are answered with dictionary lookups.
+    Records are held in a columnar ``MatchTable`` and returned as row views.
+    """
+
+    def __init__(self, records: List[Dict]):
+        self.records = (
+            records
+            if isinstance(records, MatchTable)
+            else MatchTable.from_records(records)
+        )
+        self.by_event: Dict[Tuple[str, int, str], List[int]] = {}
+        self.by_player: Dict[str, List[int]] = {}
+        columns = zip(
+            self.records.column("tournament_name"),
+            self.records.column("year"),
+            self.records.column("round"),
+            self.records.column("winner_name"),
+            self.records.column("loser_name"),
+        )
+        for row, (tournament, year, round, winner, loser) in enumerate(columns):
+            self.by_event.setdefault((tournament, year, round), []).append(row)
+            for name in (winner, loser):
+                self.by_player.setdefault(name.lower(), []).append(row)
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Dict]) -> "MatchLookupTable":
+        return cls(MatchTable.from_records(match_metadata(match) for match in matches))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def lookup(self, tournament: str, year: int, round: str) -> List[MatchRow]:
+        """Matches played in ``round`` of ``tournament`` in ``year``."""
+        rows = self.by_event.get((tournament, int(year), round), [])
+        return [self.records[row] for row in rows]
+
+    def player_matches(
+        self, name: str, opponent: Optional[str] = None
+    ) -> List[MatchRow]:
+        """Matches involving ``name`` (optionally only against ``opponent``)."""
+        rows = self.by_player.get(name.lower(), [])
+        if opponent is not None:
+            other = set(self.by_player.get(opponent.lower(), []))
+            rows = [row for row in rows if row in other]
+        return [self.records[row] for row in rows]
+
+    def save(self, path: str):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        # Rows are written one at a time rather than as one list of dicts
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write("[")
+            for row in range(len(self.records)):
+                if row:
+                    f.write(",")
+                json.dump(dict(self.records[row]), f)
+            f.write("]")
+        tmp.replace(path)
+        logger.info(f"Saved match lookup table ({len(self.records):,} matches)")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["MatchLookupTable"]:
+        """Load a saved table, or return None when none has been built."""
+        if not Path(path).exists():
+            return None
+        started = time.perf_counter()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            table = cls(json.load(f))
+        logger.info(
+            f"Loaded match lookup table ({len(table):,} matches) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return table
@@ -0,0 +1,272 @@
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+import json
+import sys
+
+import numpy as np
+
+# Fields whose values are (nearly) all distinct are stored as one UTF-8
+# buffer plus offsets instead of a vocabulary
+UNIQUE_RATIO = 0.5
+
+
+class MatchRow(Mapping):
+    """Read-only view of one row of a ``MatchTable``.
+
+    Only the table reference and row number are stored; values are decoded
+    on access, so rows that are never returned cost no dict allocation.
+    ``dict(row)`` materializes a plain record.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "MatchTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field: str):
+        return self._table.value(field, self._row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.row_fields(self._row))
+
+    def __len__(self) -> int:
+        return len(self._table.row_fields(self._row))
+
+    def __repr__(self) -> str:
+        return f"MatchRow({dict(self)!r})"
+
+
+class MatchTable:
+    """Columnar, dictionary-encoded store of flattened match metadata.
+
+    Repeated values (tournaments, players, rounds, surfaces, stats) are
+    interned once in a per-field vocabulary and rows hold the narrowest
+    integer codes that fit. Near-unique strings (match IDs, descriptions) live in a single
+    UTF-8 buffer with offsets. Values keep their original Python types,
+    and a field a record did not have stays absent from its row.
+    """
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.fields: List[str] = []
+        self.codes: Dict[str, np.ndarray] = {}
+        self.vocabs: Dict[str, List] = {}
+        self.buffers: Dict[str, bytes] = {}
+        self.offsets: Dict[str, np.ndarray] = {}
+        # Per field missing from some records: True where the row lacks it
+        self.missing: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "MatchTable":
+        builder = MatchTableBuilder()
+        for record in records:
+            builder.add(record)
+        return builder.finish()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, row: int) -> MatchRow:
+        if row < 0:
+            row += self.size
+        if not 0 <= row < self.size:
+            raise IndexError(row)
+        return MatchRow(self, row)
+
+    def row_fields(self, row: int) -> List[str]:
+        """Fields the record at ``row`` was stored with."""
+        if not self.missing:
+            return self.fields
+        return [
+            field
+            for field in self.fields
+            if field not in self.missing or not self.missing[field][row]
+        ]
+
+    def value(self, field: str, row: int):
+        absent = self.missing.get(field)
+        if absent is not None and absent[row]:
+            raise KeyError(field)
+        codes = self.codes.get(field)
+        if codes is not None:
+            return self.vocabs[field][codes[row]]
+        offsets = self.offsets.get(field)
+        if offsets is None:
+            raise KeyError(field)
+        return self.buffers[field][offsets[row] : offsets[row + 1]].decode("utf-8")
+
+    def column(self, field: str) -> List:
+        """Decoded values of one field for every row (None where absent)."""
+        if field in self.codes:
+            vocab = self.vocabs[field]
+            values = [vocab[code] for code in self.codes[field].tolist()]
+        elif field in self.offsets:
+            buffer, offsets = self.buffers[field], self.offsets[field]
+            values = [
+                buffer[offsets[row] : offsets[row + 1]].decode("utf-8")
+                for row in range(self.size)
+            ]
+        else:
+            return [None] * self.size
+        if field in self.missing:
+            values = [
+                None if absent else value
+                for value, absent in zip(values, self.missing[field].tolist())
+            ]
+        return values
+
+    def records(self, rows: Optional[Iterable[int]] = None) -> List[Dict]:
+        """Materialize rows as plain dicts (all rows by default)."""
+        rows = range(self.size) if rows is None else rows
+        return [dict(MatchRow(self, row)) for row in rows]
+
+    def nbytes(self) -> int:
+        """Approximate size of the arrays, buffers and vocabularies."""
+        total = sum(codes.nbytes for codes in self.codes.values())
+        total += sum(offsets.nbytes for offsets in self.offsets.values())
+        total += sum(len(buffer) for buffer in self.buffers.values())
+        total += sum(absent.nbytes for absent in self.missing.values())
+        for vocab in self.vocabs.values():
+            total += sum(sys.getsizeof(value) for value in vocab)
+        return total
+
+    # Persistence
+
+    def save(self, path: str):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for field, codes in self.codes.items():
+            np.save(path / f"{field}.codes.npy", codes)
+        for field, offsets in self.offsets.items():
+            np.save(path / f"{field}.offsets.npy", offsets)
+            with open(path / f"{field}.utf8", "wb") as f:
+                f.write(self.buffers[field])
+        for field, absent in self.missing.items():
+            np.save(path / f"{field}.missing.npy", absent)
+        with open(path / "table.json", "w") as f:
+            json.dump(
+                {
+                    "size": self.size,
+                    "fields": self.fields,
+                    "vocabs": self.vocabs,
+                    "missing": list(self.missing),
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "MatchTable":
+        path = Path(path)
+        with open(path / "table.json") as f:
+            meta = json.load(f)
+        table = cls(meta["size"])
+        table.fields = meta["fields"]
+        for field, vocab in meta["vocabs"].items():
+            table.vocabs[field] = [
+                sys.intern(value) if isinstance(value, str) else value
+                for value in vocab
+            ]
+            table.codes[field] = np.load(path / f"{field}.codes.npy")
+        for field in table.fields:
+            if field not in table.codes:
+                table.offsets[field] = np.load(path / f"{field}.offsets.npy")
+                table.buffers[field] = (path / f"{field}.utf8").read_bytes()
+        for field in meta.get("missing", []):
+            table.missing[field] = np.load(path / f"{field}.missing.npy")
+        return table
+
+
+class MatchTableBuilder:
+    """Builds a ``MatchTable`` one record at a time.
+
+    Records are encoded as they arrive, so a table can be built from a
+    stream without holding the records themselves. Every field is coded
+    against a vocabulary while building; fields that turn out to be
+    near-unique strings are packed into a UTF-8 buffer in ``finish``.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.fields: List[str] = []
+        # Per field: key -> code, decoded values, and one code per row
+        # (-1 where the record lacked the field)
+        self.vocabs: Dict[str, Dict] = {}
+        self.uniques: Dict[str, List] = {}
+        self.codes: Dict[str, array] = {}
+        self.strings: Dict[str, bool] = {}
+
+    def add(self, record: Dict):
+        for field in record:
+            if field not in self.codes:
+                self.fields.append(field)
+                self.vocabs[field] = {}
+                self.uniques[field] = []
+                self.codes[field] = array("i", [-1]) * self.size
+                self.strings[field] = True
+        for field in self.fields:
+            if field not in record:
+                self.codes[field].append(-1)
+                continue
+            value = record[field]
+            key = _vocab_key(value)
+            code = self.vocabs[field].get(key)
+            if code is None:
+                code = self.vocabs[field][key] = len(self.uniques[field])
+                self.uniques[field].append(
+                    sys.intern(value) if isinstance(value, str) else value
+                )
+                self.strings[field] &= isinstance(value, str)
+            self.codes[field].append(code)
+        self.size += 1
+
+    def finish(self) -> MatchTable:
+        table = MatchTable(self.size)
+        table.fields = list(self.fields)
+        for field in self.fields:
+            codes = np.frombuffer(self.codes[field], dtype=np.int32).copy()
+            uniques = self.uniques[field]
+            absent = codes < 0
+            if absent.any():
+                table.missing[field] = absent
+
+            if self.strings[field] and len(uniques) > UNIQUE_RATIO * self.size:
+                encoded = [value.encode("utf-8") for value in uniques] + [b""]
+                rows = [encoded[code] for code in codes.tolist()]
+                table.offsets[field] = np.concatenate(
+                    [[0], np.cumsum([len(value) for value in rows], dtype=np.int64)]
+                )
+                table.buffers[field] = b"".join(rows)
+                continue
+
+            if absent.any():
+                # Absent rows need a valid code; they decode to None
+                key = _vocab_key(None)
+                if key not in self.vocabs[field]:
+                    self.vocabs[field][key] = len(uniques)
+                    uniques.append(None)
+                codes[absent] = self.vocabs[field][key]
+            table.vocabs[field] = uniques
+            table.codes[field] = _narrow(codes, len(uniques))
+        return table
+
+
+def _hashable(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _vocab_key(value):
+    # Keep 1 and 1.0 (and True) apart so values round-trip with their type
+    if not _hashable(value):
+        return (json.dumps(value, sort_keys=True, default=str), type(value))
+    return (value, type(value))
+
+
+def _narrow(codes: np.ndarray, size: int) -> np.ndarray:
+    if size <= np.iinfo(np.uint8).max + 1:
+        return codes.astype(np.uint8)
+    if size <= np.iinfo(np.uint16).max + 1:
+        return codes.astype(np.uint16)
+    return codes
@@ -0,0 +1,163 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .match_table import MatchTable
+
+# Fields with an inverted index; other fields fall back to a record scan
+INDEXED_FIELDS = [
+    "year",
+    "tournament_name",
+    "round",
+    "surface",
+    "tournament_level",
+    "winner_id",
+    "loser_id",
+    "winner_name",
+    "loser_name",
+]
+
+# Fields with at most this many distinct values keep packed bitmaps;
+# the rest (players, tournaments) keep sorted row-id posting lists
+BITMAP_MAX_VALUES = 64
+
+
+class MetadataIndex:
+    """Inverted index over match metadata for pre-filtering vector search.
+
+    ``evaluate`` turns a Pinecone-style filter into a boolean row mask,
+    so the vector search only scores rows that satisfy it. Low-cardinality
+    fields (year, round, surface, level) are stored as packed bitmaps and
+    high-cardinality ones (players, tournaments) as int32 posting lists.
+    """
+
+    def __init__(self, metadata: Sequence[Dict], fields: List[str] = INDEXED_FIELDS):
+        self.size = len(metadata)
+        self.bitmaps: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict] = {}
+        self.values: Dict[str, np.ndarray] = {}
+
+        for field in fields:
+            if isinstance(metadata, MatchTable):
+                column = metadata.column(field)
+            else:
+                column = [meta.get(field) for meta in metadata]
+            present = np.fromiter(
+                (value is not None for value in column), dtype=bool, count=self.size
+            )
+            if not present.any():
+                continue
+            rows = np.flatnonzero(present).astype(np.int32)
+            keys = np.array([column[row] for row in rows], dtype=object)
+            uniques, inverse = np.unique(keys.astype(str), return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.searchsorted(inverse[order], np.arange(len(uniques) + 1))
+
+            # Keep the original typed value (e.g. int year) for each key
+            first = order[bounds[:-1]]
+            typed = [keys[i] for i in first]
+            self.values[field] = np.array(typed, dtype=object)
+
+            groups = {
+                value: rows[order[bounds[i] : bounds[i + 1]]]
+                for i, value in enumerate(typed)
+            }
+            if len(groups) <= BITMAP_MAX_VALUES:
+                self.bitmaps[field] = {
+                    value: np.packbits(self._mask_from_rows(posting))
+                    for value, posting in groups.items()
+                }
+            else:
+                self.postings[field] = groups
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.bitmaps or field in self.postings
+
+    def supports(self, filter: Dict) -> bool:
+        """Whether every condition in ``filter`` can be answered here."""
+        for key, condition in filter.items():
+            if key in ("$and", "$or"):
+                if not all(self.supports(sub) for sub in condition):
+                    return False
+            elif key not in self:
+                return False
+            elif isinstance(condition, dict) and not set(condition) <= _SUPPORTED_OPS:
+                return False
+        return True
+
+    def evaluate(self, filter: Dict) -> np.ndarray:
+        """Boolean mask of the rows matching ``filter``."""
+        mask = np.ones(self.size, dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self.evaluate(sub)
+            elif key == "$or":
+                either = np.zeros(self.size, dtype=bool)
+                for sub in condition:
+                    either |= self.evaluate(sub)
+                mask &= either
+            elif isinstance(condition, dict):
+                for op, arg in condition.items():
+                    mask &= self._evaluate_op(key, op, arg)
+            else:
+                mask &= self._value_mask(key, condition)
+        return mask
+
+    def count(self, filter: Dict) -> int:
+        return int(self.evaluate(filter).sum())
+
+    def _evaluate_op(self, field: str, op: str, arg) -> np.ndarray:
+        if op == "$eq":
+            return self._value_mask(field, arg)
+        if op == "$ne":
+            return ~self._value_mask(field, arg)
+        if op == "$in":
+            return self._values_mask(field, arg)
+        if op == "$nin":
+            return ~self._values_mask(field, arg)
+
+        values = [
+            value for value in self.values.get(field, []) if _compare(op, value, arg)
+        ]
+        return self._values_mask(field, values)
+
+    def _values_mask(self, field: str, values) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            mask |= self._value_mask(field, value)
+        return mask
+
+    def _value_mask(self, field: str, value) -> np.ndarray:
+        if field in self.bitmaps:
+            bitmap = self.bitmaps[field].get(value)
+            if bitmap is None:
+                return np.zeros(self.size, dtype=bool)
+            return np.unpackbits(bitmap, count=self.size).astype(bool)
+        posting = self.postings.get(field, {}).get(value)
+        if posting is None:
+            return np.zeros(self.size, dtype=bool)
+        return self._mask_from_rows(posting)
+
+    def _mask_from_rows(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+
+_SUPPORTED_OPS = {"$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte"}
+
+
+def _compare(op: str, value, arg) -> bool:
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported filter operator: {op}")
@@ -0,0 +1,307 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import bisect
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans range from sub-millisecond parsing to multi-second LLM calls
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[label]) for label in self.labels), 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, Dict, float]]:
+        for key, value in sorted(self._values.items()):
+            yield self.name + "_total", dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts, then sum
+        self._counts: Dict[Tuple, List[int]] = {}
+        self._sums: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[slot] += 1
+            self._sums[key] += value
+
+    def samples(self) -> Iterator[Tuple[str, Dict, float]]:
+        for key, counts in sorted(self._counts.items()):
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield self.name + "_bucket", {**labels, "le": le}, cumulative
+            yield self.name + "_sum", labels, self._sums[key]
+            yield self.name + "_count", labels, cumulative
+
+    def totals(self) -> Dict[Tuple, Tuple[int, float]]:
+        """(count, sum) per label-value tuple."""
+        with self._lock:
+            return {
+                key: (sum(counts), self._sums[key])
+                for key, counts in self._counts.items()
+            }
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text format."""
+
+    def __init__(self, namespace: str = "tennistorch"):
+        self.namespace = namespace
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(
+            Histogram(f"{self.namespace}_{name}", help, labels, buckets)
+        )
+
+    def _register(self, metric):
+        # Re-registering (e.g. on module reload) returns the existing metric
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(
+                        f'{label}="{_escape(value)}"' for label, value in labels.items()
+                    )
+                    name = f"{name}{{{rendered}}}"
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "request_duration_seconds",
+    "HTTP request latency until the last body byte",
+    ["method", "path", "status"],
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_duration_seconds", "Time spent in each query pipeline stage", ["stage"]
+)
+REQUEST_BYTES = REGISTRY.counter(
+    "request_bytes", "HTTP request body bytes received", ["path"]
+)
+RESPONSE_BYTES = REGISTRY.counter(
+    "response_bytes", "HTTP response body bytes sent", ["path"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens",
+    "Chat completion tokens (streamed calls are estimated)",
+    ["model", "kind"],
+)
+EMBEDDING_TOKENS = REGISTRY.counter(
+    "embedding_tokens", "Tokens sent to the embedding API", ["model"]
+)
+
+
+class Trace:
+    """Stage timings collected for one request."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.spans: List[Tuple[str, float]] = []
+
+    def durations(self) -> Dict[str, float]:
+        """Seconds per stage, summed when a stage ran more than once."""
+        totals: Dict[str, float] = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}"
+            for stage, seconds in self.durations().items()
+        )
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration measured elsewhere."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    """Time a pipeline stage into the histogram and the request's trace.
+
+    Work handed to another task (single-flight, executors) is attributed
+    to the trace that started it.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Each request gets an ID (the client's ``X-Request-ID`` when sent) and a
+    trace that ``span`` records into. The response carries ``X-Request-ID``
+    and a ``Server-Timing`` header with the stages finished before the
+    headers went out, which for buffered responses is all of them. Body
+    bytes are counted as they stream, and one summary line is logged per
+    request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_id = _header(scope, b"x-request-id") or uuid.uuid4().hex
+        trace = Trace(request_id)
+        token = _current_trace.set(trace)
+        status = 500
+        received = sent = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def traced_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if trace.spans:
+                    headers.append(
+                        (b"server-timing", trace.server_timing().encode("latin-1"))
+                    )
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, traced_send)
+        finally:
+            _current_trace.reset(token)
+            elapsed = time.perf_counter() - started
+            # Route templates keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(
+                elapsed, method=scope["method"], path=path, status=status
+            )
+            REQUEST_BYTES.inc(received, path=path)
+            RESPONSE_BYTES.inc(sent, path=path)
+            if logger.isEnabledFor(logging.INFO) and route is not None:
+                logger.info(
+                    "%s %s %d %.1fms request_id=%s%s",
+                    scope["method"],
+                    path,
+                    status,
+                    elapsed * 1000,
+                    request_id,
+                    f" {trace.server_timing()}" if trace.spans else "",
+                )
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            # Bounded so a client cannot inflate logs and headers
+            return value.decode("latin-1")[:64]
+    return None
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,285 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import logging
+import re
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+TOURNAMENTS = {
+    "australian open": "Australian Open",
+    "french open": "Roland Garros",
+    "roland garros": "Roland Garros",
+    "wimbledon": "Wimbledon",
+    "us open": "US Open",
+}
+
+# Rounds in the order they take precedence when a query names several
+ROUND_PRIORITY = ["QF", "SF", "F", "R16", "R32", "R64", "R128"]
+
+WINNER_WORDS = [
+    "won",
+    "winner",
+    "winners",
+    "champion",
+    "champions",
+    "title",
+    "titles",
+    "crown",
+    "triumph",
+]
+
+# Words that ask for the other side or the result of a match
+LOSER_WORDS = [
+    "lost",
+    "lose",
+    "loses",
+    "loser",
+    "losers",
+    "runner up",
+    "runners up",
+    "runnerup",
+    "finalist",
+    "beaten",
+]
+SCORE_WORDS = ["score", "scores", "scoreline", "result", "results"]
+
+# Query-type keywords; naming a tournament makes a "tournament" query
+QUERY_TYPE_WORDS = {
+    "statistical": ["stats", "statistics", "average", "most", "least"],
+    "head_to_head": ["head to head", "h2h", "versus", "vs", "against"],
+    "surface": ["clay", "grass", "hard"],
+}
+
+# Surnames that are also ordinary query words never name a player alone
+STOPWORDS = set(
+    """
+    a all an and ball best big by can court day did do down ever for game
+    good great has have he high his how in is king last long low man many
+    match matches me more new of on one open or over play player players
+    point power round score set sets so than the their time to top up was we
+    what when where which who why will win wins with year years young
+    """.split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_YEAR = re.compile(r"(?:19|20)\d{2}")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case ASCII word tokens (accents folded, punctuation dropped)."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return _TOKEN.findall(text.lower())
+
+
+def _round_phrases() -> List[Tuple[str, str]]:
+    phrases = []
+    for prefix, code in (("quarter", "QF"), ("semi", "SF")):
+        for final in ("final", "finals"):
+            phrases += [(f"{prefix} {final}", code), (f"{prefix}{final}", code)]
+    phrases += [("final", "F"), ("finals", "F")]
+    for ordinal, size, code in (
+        ("fourth", 16, "R16"),
+        ("third", 32, "R32"),
+        ("second", 64, "R64"),
+        ("first", 128, "R128"),
+    ):
+        for word in ("round", "rounds"):
+            phrases += [(f"{ordinal} {word}", code), (f"{ordinal}{word}", code)]
+        phrases += [(f"round of {size}", code), (f"r{size}", code)]
+    return phrases
+
+
+class QueryParser:
+    """Single-pass parser for tennis questions.
+
+    Every phrase the parser knows (tournaments, rounds, winner words,
+    query-type keywords and player names) is compiled once into a token
+    trie. A query is tokenized and scanned left to right taking the longest
+    phrase at each position, Aho-Corasick style, so years, rounds,
+    tournaments, players and the query type all come out of one pass
+    regardless of how many names are loaded.
+
+    Players are matched by full name, and by surname alone when the
+    surname is not an ordinary word and resolves to one player: the one
+    with the most matches when ``match_counts`` is given, otherwise only
+    if no other player shares it.
+    """
+
+    def __init__(
+        self,
+        players: Iterable[Union[str, Tuple[str, str]]] = (),
+        match_counts: Optional[Dict[str, int]] = None,
+    ):
+        self._root: Dict = {}
+        for phrase, tournament in TOURNAMENTS.items():
+            self._add(phrase, "tournament", tournament)
+        for phrase, code in _round_phrases():
+            self._add(phrase, "round", code)
+        for word in WINNER_WORDS:
+            self._add(word, "winner_word", True)
+        for word in LOSER_WORDS:
+            self._add(word, "loser_word", True)
+        for word in SCORE_WORDS:
+            self._add(word, "score_word", True)
+        for query_type, words in QUERY_TYPE_WORDS.items():
+            for word in words:
+                self._add(word, query_type, True)
+        self.player_count = self._add_players(players, match_counts or {})
+
+    @classmethod
+    def from_player_data(
+        cls, players_df, match_counts: Optional[Dict[str, int]] = None
+    ) -> "QueryParser":
+        """Build from ``ATPDataLoader.load_player_data()``."""
+        started = time.perf_counter()
+        first = players_df["name_first"].fillna("").astype(str).str.strip()
+        last = players_df["name_last"].fillna("").astype(str).str.strip()
+        names = (first + " " + last).str.strip()
+        known = names != ""
+        parser = cls(zip(names[known], last[known]), match_counts)
+        logger.info(
+            f"Query parser ready with {parser.player_count:,} player names "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return parser
+
+    def _add(self, phrase, kind: str, value) -> bool:
+        tokens = tokenize(phrase) if isinstance(phrase, str) else phrase
+        if not tokens:
+            return False
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        payload = node.setdefault(None, {})
+        if kind in payload:
+            return False
+        payload[kind] = value
+        return True
+
+    def _add_players(self, players: Iterable, match_counts: Dict[str, int]) -> int:
+        # (full name, surname); bare names use their last word as surname
+        players = {
+            (player, player.rsplit(" ", 1)[-1]) if isinstance(player, str) else player
+            for player in players
+        }
+        surnames: Dict[Tuple[str, ...], List[str]] = {}
+        added = 0
+        for name, surname in sorted(
+            players, key=lambda player: (-match_counts.get(player[0], 0), player)
+        ):
+            tokens = tokenize(name)
+            # The most-played player keeps a full name shared by several
+            added += self._add(tokens, "player", name)
+            surname = tuple(tokenize(surname))
+            if surname and surname != tuple(tokens):
+                surnames.setdefault(surname, []).append(name)
+
+        for surname, candidates in surnames.items():
+            if len(surname) == 1 and surname[0] in STOPWORDS:
+                continue
+            if self._payload(surname) is not None:
+                # Already a keyword ("clay", "final") or someone's full name
+                continue
+            if match_counts:
+                candidates = [name for name in candidates if match_counts.get(name)]
+            elif len(candidates) > 1:
+                continue
+            if candidates:
+                self._add(list(surname), "player", candidates[0])
+        return added
+
+    def _payload(self, tokens: Iterable[str]) -> Optional[Dict]:
+        node = self._root
+        for token in tokens:
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get(None)
+
+    def parse(self, query: str) -> Dict:
+        """Extract years, tournament, round, players, what is asked and the
+        query type."""
+        tokens = tokenize(query)
+        years: List[str] = []
+        tournament = None
+        rounds = set()
+        players: List[str] = []
+        found = set()
+
+        i = 0
+        while i < len(tokens):
+            node, end, payload = self._root, i, None
+            j = i
+            while j < len(tokens):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node:
+                    end, payload = j, node[None]
+            if payload is None:
+                if _YEAR.fullmatch(tokens[i]):
+                    years.append(tokens[i])
+                i += 1
+                continue
+
+            for kind, value in payload.items():
+                found.add(kind)
+                if kind == "tournament" and tournament is None:
+                    tournament = value
+                elif kind == "round":
+                    rounds.add(value)
+                elif kind == "player" and value not in players:
+                    players.append(value)
+            i = end
+
+        parsed: Dict = {}
+        if years:
+            parsed["years"] = years
+        if tournament is not None:
+            parsed["tournament"] = tournament
+        if rounds:
+            parsed["round"] = min(rounds, key=ROUND_PRIORITY.index)
+        elif "winner_word" in found:
+            # Questions about winners or champions are about finals
+            parsed["round"] = "F"
+        if players:
+            parsed["players"] = players
+        # What the question asks about the match: its score, who lost or
+        # who won (in that precedence, since "the score when X won" asks
+        # for the score)
+        for kind, asks in (
+            ("score_word", "score"),
+            ("loser_word", "loser"),
+            ("winner_word", "winner"),
+        ):
+            if kind in found:
+                parsed["asks"] = asks
+                break
+        parsed["query_type"] = self._query_type(found, players)
+        return parsed
+
+    @staticmethod
+    def _query_type(found: set, players: List[str]) -> str:
+        if "statistical" in found:
+            return "statistical"
+        if "head_to_head" in found or len(players) == 2:
+            return "head_to_head"
+        for query_type in ("tournament", "surface"):
+            if query_type in found:
+                return query_type
+        return "general"
+
+
+def create_query_parser(
+    data_path: str, match_counts: Optional[Dict[str, int]] = None
+) -> QueryParser:
+    """Parser with the player gazetteer from ``atp_players.csv`` if present."""
+    from app.data.ingestion.atp_data_loader import ATPDataLoader
+
+    loader = ATPDataLoader(data_path)
+    if not (loader.data_path / "atp_players.csv").exists():
+        logger.info(f"No player data in {data_path}; parsing without player names")
+        return QueryParser()
+    return QueryParser.from_player_data(loader.load_player_data(), match_counts)
@@ -1,4 +1,4 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from .vector_store import TennisVectorStore
 from openai import AsyncOpenAI
 from langchain.schema import Document
@@ -10,25 +10,32 @@ logger = logging.getLogger(__name__)
 
 
 class TennisRAGService:
-    def __init__(self):
-        self.vector_store = TennisVectorStore()
-        self.llm = AsyncOpenAI()
+    def __init__(
+        self,
+        vector_store: Optional[TennisVectorStore] = None,
+        llm: Optional[AsyncOpenAI] = None,
+    ):
+        self.llm = llm or AsyncOpenAI()
+        self.vector_store = vector_store or TennisVectorStore(openai_client=self.llm)
 
     async def answer_query(self, question: str) -> Dict:
         """Answer tennis questions using RAG"""
         # Get relevant matches
         matches = await self.vector_store.search_matches(question)
 
-        # Log retrieved matches
-        logger.info("\n=== Retrieved Matches ===")
-        for i, match in enumerate(matches[:3], 1):
-            logger.info(f"\nMatch {i} (Similarity: {match['similarity']:.3f}):")
-            logger.info(f"Description: {match['description']}")
-            logger.info(
-                f"Tournament: {match['tournament']['name']} ({match['tournament']['date']})"
-            )
-            logger.info(f"Surface: {match['tournament']['surface']}")
-            logger.info(f"Round: {match['round']}")
+        # Log retrieved matches (debug only; this runs on every request)
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, match in enumerate(matches[:3], 1):
+                logger.debug(
+                    "Retrieved match %d (similarity %.3f): %s | %s (%s) | %s | %s",
+                    i,
+                    match["similarity"],
+                    match["description"],
+                    match["tournament"]["name"],
+                    match["tournament"]["date"],
+                    match["tournament"]["surface"],
+                    match["round"],
+                )
 
         # Create context from matches
         context = self._format_context(matches)
@@ -36,9 +43,7 @@ class TennisRAGService:
         # Generate response using GPT-4
         prompt = self._create_prompt(question, context)
 
-        # Log the full prompt
-        logger.info("\n=== Full Prompt to OpenAI ===")
-        logger.info(prompt)
+        logger.debug("Prompt to OpenAI:\n%s", prompt)
 
         chat_completion = await self.llm.chat.completions.create(
             model="gpt-4-turbo-preview",
@@ -55,9 +60,7 @@ class TennisRAGService:
             max_tokens=1000,
         )
 
-        # Log the response
-        logger.info("\n=== OpenAI Response ===")
-        logger.info(chat_completion.choices[0].message.content)
+        logger.debug("OpenAI response:\n%s", chat_completion.choices[0].message.content)
 
         return {
             "answer": chat_completion.choices[0].message.content,
@@ -0,0 +1,190 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from .local_index import ScoredVector
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Local cross-encoder that re-scores retrieved matches on CPU.
+
+    The top ``candidates`` hits are scored as (query, description) pairs in
+    batches of ``batch_size`` spread over a thread pool, and only the best
+    ``top_k`` are kept, so the prompt gets fewer, better matches. Each
+    search has ``deadline_ms`` from its start: reranking is skipped when
+    the time left is below the expected cost (tracked per candidate), and
+    abandoned if it overruns, keeping retrieval order. The model loads in
+    ``warm``; requests arriving before then are not reranked.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        candidates: int = 30,
+        top_k: int = 5,
+        batch_size: int = 16,
+        deadline_ms: float = 250.0,
+        threads: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.deadline = deadline_ms / 1000.0
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="reranker"
+        )
+        self.model = None
+        self.available = True
+        self._load_lock = threading.Lock()
+        # Moving average of seconds per scored candidate
+        self._cost: Optional[float] = None
+        self.reranked = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+
+    def _load(self):
+        with self._load_lock:
+            if self.model is not None or not self.available:
+                return
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                logger.warning(
+                    "Reranking disabled: the cross-encoder needs "
+                    "sentence-transformers (pip install sentence-transformers)"
+                )
+                self.available = False
+                return
+            started = time.perf_counter()
+            self.model = CrossEncoder(self.model_name, device="cpu")
+            logger.info(
+                f"Loaded reranker {self.model_name} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+
+    def _score(self, pairs: List[List[str]]) -> List[float]:
+        # Single-label cross-encoders return sigmoid scores in [0, 1]
+        return [
+            float(score)
+            for score in self.model.predict(
+                pairs, batch_size=self.batch_size, show_progress_bar=False
+            )
+        ]
+
+    async def warm(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._load)
+        if self.model is not None:
+            await loop.run_in_executor(self.executor, self._score, [["warm", "up"]])
+
+    async def rerank(
+        self,
+        query: str,
+        matches: List,
+        deadline: float,
+        top_k: Optional[int] = None,
+    ) -> List[ScoredVector]:
+        """Best ``top_k`` of ``matches`` by cross-encoder score.
+
+        ``deadline`` is a ``time.perf_counter()`` value and ``top_k``
+        defaults to the configured one. Returns ``matches`` unchanged when
+        reranking is skipped or runs out of time.
+        """
+        candidates = matches[: self.candidates]
+        if self.model is None or len(candidates) < 2:
+            return matches
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 or (
+            self._cost is not None and self._cost * len(candidates) > remaining
+        ):
+            self.skipped += 1
+            if self._cost is not None:
+                # Decay the estimate so a slow spell does not disable reranking
+                self._cost *= 0.9
+            logger.debug("Skipping rerank, %.0fms left", remaining * 1000)
+            return matches
+
+        pairs = [[query, _passage(match.metadata)] for match in candidates]
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        batches = [
+            loop.run_in_executor(
+                self.executor, self._score, pairs[i : i + self.batch_size]
+            )
+            for i in range(0, len(pairs), self.batch_size)
+        ]
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*batches), remaining)
+        except asyncio.TimeoutError:
+            # Batches not yet started are cancelled. The true cost is
+            # above what was observed, so later searches skip until it decays
+            self.timeouts += 1
+            self._cost = 2 * (time.perf_counter() - started) / len(candidates)
+            logger.debug("Rerank overran its %.0fms budget", remaining * 1000)
+            return matches
+        elapsed = time.perf_counter() - started
+        per_candidate = elapsed / len(candidates)
+        self._cost = (
+            per_candidate
+            if self._cost is None
+            else 0.8 * self._cost + 0.2 * per_candidate
+        )
+        self.reranked += 1
+        self.total_seconds += elapsed
+
+        scores = [score for batch in results for score in batch]
+        ranked = sorted(
+            zip(scores, range(len(candidates))), key=lambda pair: pair[0], reverse=True
+        )
+        return [
+            ScoredVector(candidates[i].id, score, candidates[i].metadata)
+            for score, i in ranked[: top_k or self.top_k]
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_name,
+            "loaded": self.model is not None,
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "timeouts": self.timeouts,
+            "avg_ms": (
+                round(self.total_seconds / self.reranked * 1000, 1)
+                if self.reranked
+                else 0.0
+            ),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def _passage(metadata: Dict) -> str:
+    # Descriptions are multi-line templates; collapse their indentation
+    return " ".join(str(metadata.get("description", "")).split())
+
+
+def create_reranker() -> Optional[CrossEncoderReranker]:
+    """Build the reranker selected by ``RERANKER`` (none/cross-encoder)."""
+    backend = os.getenv("RERANKER", "none").lower()
+    if backend == "none":
+        return None
+    if backend != "cross-encoder":
+        raise ValueError(f"Unknown RERANKER: {backend}")
+    return CrossEncoderReranker(
+        model_name=os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+        candidates=int(os.getenv("RERANK_CANDIDATES", "30")),
+        top_k=int(os.getenv("RERANK_TOP_K", "5")),
+        batch_size=int(os.getenv("RERANK_BATCH_SIZE", "16")),
+        deadline_ms=float(os.getenv("RERANK_DEADLINE_MS", "250")),
+        threads=int(os.getenv("RERANK_THREADS", "0")) or None,
+    )
@@ -0,0 +1,49 @@
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the call; callers arriving while it
+    runs await the same task instead of repeating the work. Nothing is
+    kept once the call finishes, so this only deduplicates concurrent
+    requests (caching is the answer and embedding caches' job). The task
+    is shielded, so one caller disconnecting does not cancel it for the
+    others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> Dict:
+        requests = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "coalesced_rate": round(self.coalesced / requests, 3) if requests else 0.0,
+        }
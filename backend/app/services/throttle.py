@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+
+class TokenBudget:
+    """Token-per-minute budget shared by concurrent API requests."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        """Wait until ``tokens`` can be spent without exceeding the budget."""
+        tokens = min(float(tokens), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that halves on throttling and creeps back up.
+
+    Used as an async context manager around each request. ``on_throttle``
+    is called when the server answers 429 and ``on_success`` after each
+    successful call (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttle(self):
+        self.limit = max(self.min_limit, self.limit // 2)
+        self._successes = 0
@@ -1,161 +1,512 @@
-from typing import List, Dict
-from openai import AsyncOpenAI
+from typing import Callable, Iterable, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from openai import AsyncOpenAI, RateLimitError
 from pinecone import Pinecone
+import asyncio
+import functools
 import logging
 import os
+import random
+import time
 from dotenv import load_dotenv
 import uuid
-import re
+
+from .embedder import Embedder, OpenAIEmbedder
+from .query_parser import QueryParser
+from .embedding_cache import normalize_query
+from .single_flight import SingleFlight
+from .metrics import span
+from .local_index import LocalVectorIndex, ScoredVector
+from .throttle import AdaptiveConcurrency, TokenBudget
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+def match_vector_id(match: Dict) -> str:
+    """Deterministic vector ID for a match record."""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"tennis-match-{match['match_id']}"))
+
+
+def match_metadata(match: Dict) -> Dict:
+    """Flatten a match record into the metadata stored with its vector."""
+    winner = match["players"]["winner"]
+    loser = match["players"]["loser"]
+
+    return {
+        "match_id": match["match_id"],
+        "description": match["description"],
+        # Numeric so the index can filter on it exactly
+        "year": int(match["tournament"]["date"][:4]),
+        "tournament_name": match["tournament"]["name"],
+        "tournament_level": match["tournament"]["level"],
+        "surface": match["tournament"]["surface"],
+        "winner_name": winner["name"],
+        "winner_id": winner["id"],
+        "loser_name": loser["name"],
+        "loser_id": loser["id"],
+        "score": match["score"],
+        "round": match["round"],
+        # Convert stats to strings or numbers
+        "winner_aces": match["stats"].get("winner_aces", 0),
+        "winner_df": match["stats"].get("winner_df", 0),
+        "loser_aces": match["stats"].get("loser_aces", 0),
+        "loser_df": match["stats"].get("loser_df", 0),
+    }
+
+
+def reciprocal_rank_fusion(rankings: List[List], k: int = 60) -> List[ScoredVector]:
+    """Merge ranked result lists by summing 1 / (k + rank) per match.
+
+    Matches are identified by ``match_id``, so vector and lexical hits for
+    the same match combine. Ties keep the order of the earlier ranking.
+    Scores are scaled so a match ranked first everywhere scores 1.0.
+    """
+    fused: Dict[str, List] = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, 1):
+            entry = fused.setdefault(match.metadata["match_id"], [0.0, match])
+            entry[0] += 1.0 / (k + rank)
+    ordered = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+    best = len(rankings) / (k + 1)
+    return [
+        ScoredVector(match.id, score / best, match.metadata) for score, match in ordered
+    ]
+
+
+def create_index(pool_threads: int = 1):
+    """Open the vector index selected by ``VECTOR_BACKEND`` (pinecone/local)."""
+    backend = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    if backend == "local":
+        return LocalVectorIndex.load(
+            os.getenv("LOCAL_INDEX_PATH", "data/local_index"),
+            dtype=os.getenv("LOCAL_INDEX_DTYPE", "float32"),
+            nprobe=int(os.getenv("LOCAL_INDEX_NPROBE", "8")),
+        )
+    if backend != "pinecone":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+
+    # Initialize Pinecone with new syntax
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), pool_threads=pool_threads)
+
+    # Connect directly to the index
+    return pc.Index("tennis")
+
+
+def index_target(embedder: Embedder) -> str:
+    """Identify the index ``create_index`` opens and the model filling it,
+    for the ingest manifest."""
+    backend = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    if backend == "local":
+        path = Path(os.getenv("LOCAL_INDEX_PATH", "data/local_index")).resolve()
+        index = f"local:{path}"
+    else:
+        index = f"{backend}:tennis"
+    return f"{index}|{embedder.model_name}:{embedder.dimension}"
+
+
 class TennisVectorStore:
-    def __init__(self):
-        # Initialize Pinecone with new syntax
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-
-        # Connect directly to the index
-        self.index = pc.Index("tennis")
-        self.openai = AsyncOpenAI()
-
-    async def store_matches(self, matches: List[Dict]):
-        """Store processed match data in vector database"""
-        batch_size = 100
-
-        for i in range(0, len(matches), batch_size):
-            batch = matches[i : i + batch_size]
-
-            # Batch embedding creation
-            descriptions = [match["description"] for match in batch]
-            response = await self.openai.embeddings.create(
-                model="text-embedding-3-small",
-                input=descriptions,
+    def __init__(
+        self,
+        index=None,
+        openai_client: Optional[AsyncOpenAI] = None,
+        embedder: Optional[Embedder] = None,
+        lookup=None,
+        analytics=None,
+        parser: Optional[QueryParser] = None,
+        lexical=None,
+        reranker=None,
+    ):
+        self.index = index if index is not None else create_index()
+        self.embedder = embedder or OpenAIEmbedder(openai_client)
+        if isinstance(self.index, LocalVectorIndex):
+            # Vectors from another model give wrong dimensions or
+            # meaningless scores against this embedder's queries
+            self.index.bind_model(self.embedder.model_name)
+        # Optional MatchLookupTable for exact tournament/year/round answers
+        self.lookup = lookup
+        # Optional TennisAnalyticsStore with full-dataset career records
+        self.analytics = analytics
+        # Shared compiled parser (with the player gazetteer when loaded)
+        self.parser = parser or QueryParser()
+        # Optional LexicalIndex (BM25) searched alongside the vector index
+        self.lexical = lexical
+        self.fusion_k = int(os.getenv("HYBRID_RRF_K", "60"))
+        # Optional CrossEncoderReranker applied to searched (not exact) results
+        self.reranker = reranker
+
+        # Ingestion pipeline settings
+        self.embed_concurrency = int(os.getenv("EMBED_CONCURRENCY", "4"))
+        self.embed_tokens_per_minute = int(
+            os.getenv("EMBED_TOKENS_PER_MINUTE", "1000000")
+        )
+        self.upsert_concurrency = int(os.getenv("UPSERT_CONCURRENCY", "2"))
+        self.max_retries = int(os.getenv("INGEST_MAX_RETRIES", "8"))
+        self._upsert_executor: Optional[ThreadPoolExecutor] = None
+
+        # Concurrent identical searches share one parse/embed/query pass
+        self.search_flights = SingleFlight("retrieval")
+
+        # Blocking index queries and analytics reads run on their own pool
+        # (0 threads runs them inline on the event loop)
+        self.query_threads = int(os.getenv("INDEX_QUERY_THREADS", "16"))
+        self._query_executor: Optional[ThreadPoolExecutor] = None
+
+    def close(self):
+        """Release the thread pools and the embedder."""
+        self.embedder.close()
+        if self.reranker is not None:
+            self.reranker.close()
+        if self._upsert_executor is not None:
+            self._upsert_executor.shutdown(wait=False)
+            self._upsert_executor = None
+        if self._query_executor is not None:
+            self._query_executor.shutdown(wait=False)
+            self._query_executor = None
+
+    async def _run_blocking(self, fn: Callable, *args, **kwargs):
+        """Run a blocking index or analytics call off the event loop."""
+        if self.query_threads <= 0:
+            return fn(*args, **kwargs)
+        if self._query_executor is None:
+            self._query_executor = ThreadPoolExecutor(
+                max_workers=self.query_threads, thread_name_prefix="index-query"
             )
-            vectors = [item.embedding for item in response.data]
-
-            # Prepare vectors for Pinecone with flattened metadata
-            to_upsert = []
-            for match, vector in zip(batch, vectors):
-                vector_id = str(
-                    uuid.uuid5(uuid.NAMESPACE_DNS, f"tennis-match-{match['match_id']}")
-                )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._query_executor, functools.partial(fn, *args, **kwargs)
+        )
 
-                # Flatten the players data
-                winner = match["players"]["winner"]
-                loser = match["players"]["loser"]
-
-                # Create flattened metadata
-                metadata = {
-                    "match_id": match["match_id"],
-                    "description": match["description"],
-                    "tournament_name": match["tournament"]["name"],
-                    "tournament_level": match["tournament"]["level"],
-                    "surface": match["tournament"]["surface"],
-                    "winner_name": winner["name"],
-                    "winner_id": winner["id"],
-                    "loser_name": loser["name"],
-                    "loser_id": loser["id"],
-                    "score": match["score"],
-                    "round": match["round"],
-                    # Convert stats to strings or numbers
-                    "winner_aces": match["stats"].get("winner_aces", 0),
-                    "winner_df": match["stats"].get("winner_df", 0),
-                    "loser_aces": match["stats"].get("loser_aces", 0),
-                    "loser_df": match["stats"].get("loser_df", 0),
-                }
+    def flush(self):
+        """Persist indexes that keep their data locally (no-op for Pinecone)."""
+        save = getattr(self.index, "save", None)
+        if save is not None:
+            save()
+
+    async def store_matches(
+        self,
+        matches: Iterable[Dict],
+        batch_size: int = 100,
+        on_batch: Optional[Callable[[List[Dict]], None]] = None,
+    ) -> Dict:
+        """Store processed match data in vector database.
+
+        Batches flow through a bounded pipeline: several embedding requests
+        run concurrently under a token budget and an adaptive concurrency
+        limit that backs off on 429s, while upserts run in a thread pool so
+        the blocking Pinecone client never stalls the event loop.
+        ``on_batch`` is called with each batch once it is in the index.
+        """
+        if self._upsert_executor is None:
+            self._upsert_executor = ThreadPoolExecutor(
+                max_workers=self.upsert_concurrency,
+                thread_name_prefix="pinecone-upsert",
+            )
 
-                to_upsert.append(
+        limiter = AdaptiveConcurrency(self.embed_concurrency)
+        budget = TokenBudget(self.embed_tokens_per_minute)
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=self.upsert_concurrency * 2)
+        stats = {"matches": 0, "batches": 0, "rate_limited": 0}
+        started = time.perf_counter()
+
+        async def produce():
+            batch = []
+            for match in matches:
+                batch.append(match)
+                if len(batch) == batch_size:
+                    await embed_queue.put(batch)
+                    batch = []
+            if batch:
+                await embed_queue.put(batch)
+            for _ in range(self.embed_concurrency):
+                await embed_queue.put(None)
+
+        async def embed():
+            while True:
+                batch = await embed_queue.get()
+                if batch is None:
+                    return
+                vectors = await self._embed_batch(batch, limiter, budget, stats)
+
+                # Prepare vectors for Pinecone with flattened metadata
+                to_upsert = [
                     {
-                        "id": vector_id,
+                        "id": match_vector_id(match),
                         "values": vector,
-                        "metadata": metadata,
+                        "metadata": match_metadata(match),
                     }
+                    for match, vector in zip(batch, vectors)
+                ]
+                await upsert_queue.put((batch, to_upsert))
+
+        async def upsert():
+            loop = asyncio.get_running_loop()
+            while True:
+                item = await upsert_queue.get()
+                if item is None:
+                    return
+                batch, to_upsert = item
+                await loop.run_in_executor(
+                    self._upsert_executor, self._upsert_batch, to_upsert, stats
                 )
-
-            # Upsert to Pinecone
-            self.index.upsert(vectors=to_upsert)
+                stats["matches"] += len(batch)
+                stats["batches"] += 1
+                if on_batch is not None:
+                    on_batch(batch)
+
+        async def embed_stage():
+            await asyncio.gather(*(embed() for _ in range(self.embed_concurrency)))
+            for _ in range(self.upsert_concurrency):
+                await upsert_queue.put(None)
+
+        tasks = [
+            asyncio.create_task(produce()),
+            asyncio.create_task(embed_stage()),
+            *(asyncio.create_task(upsert()) for _ in range(self.upsert_concurrency)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["matches_per_sec"] = (
+            round(stats["matches"] / elapsed, 1) if elapsed else 0.0
+        )
+        logger.info(
+            f"Stored {stats['matches']:,} matches in {elapsed:.1f}s "
+            f"({stats['matches_per_sec']:,} matches/sec, "
+            f"{stats['rate_limited']} rate-limited requests)"
+        )
+        return stats
+
+    async def _embed_batch(
+        self,
+        batch: List[Dict],
+        limiter: AdaptiveConcurrency,
+        budget: TokenBudget,
+        stats: Dict,
+    ) -> List[List[float]]:
+        """Embed one batch, backing off and narrowing concurrency on 429s."""
+        descriptions = [match["description"] for match in batch]
+        # Rough token estimate (~4 characters per token) for the budget
+        tokens = sum(len(text) for text in descriptions) // 4 + 1
+
+        delay = 1.0
+        for attempt in range(self.max_retries):
+            if self.embedder.remote:
+                await budget.acquire(tokens)
+            async with limiter:
+                try:
+                    vectors = await self.embedder.embed(descriptions)
+                except RateLimitError:
+                    limiter.on_throttle()
+                    stats["rate_limited"] += 1
+                    if attempt == self.max_retries - 1:
+                        raise
+                else:
+                    limiter.on_success()
+                    return vectors
+
+            logger.warning(
+                f"Embedding rate limited, retrying in {delay:.1f}s "
+                f"(concurrency now {limiter.limit})"
+            )
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            delay = min(delay * 2, 60.0)
+
+    def _upsert_batch(self, to_upsert: List[Dict], stats: Dict):
+        """Blocking upsert with backoff on 429, run in the upsert thread pool."""
+        delay = 1.0
+        for attempt in range(self.max_retries):
+            try:
+                self.index.upsert(vectors=to_upsert)
+                return
+            except Exception as e:
+                if getattr(e, "status", None) != 429 or attempt == self.max_retries - 1:
+                    raise
+                stats["rate_limited"] += 1
+                logger.warning(f"Upsert rate limited, retrying in {delay:.1f}s")
+                time.sleep(delay + random.uniform(0, delay))
+                delay = min(delay * 2, 60.0)
 
     def _parse_query(self, query: str) -> Dict[str, str | List[str]]:
         """Extract structured information from natural language query."""
-        query = query.lower().strip()
-        parsed = {}
-        logger.info(f"Parsing query: {query}")
-
-        # Extract all years - match full 4-digit years without capture groups
-        year_pattern = r"\b(?:19|20)\d{2}\b"
-        full_years = re.findall(year_pattern, query)
-        if full_years:
-            parsed["years"] = full_years
-            logger.info(f"Extracted years: {parsed['years']}")
-
-        # Extract tournament
-        tournaments = {
-            "australian open": "Australian Open",
-            "french open": "Roland Garros",
-            "roland garros": "Roland Garros",
-            "wimbledon": "Wimbledon",
-            "us open": "US Open",
-        }
-        for key, value in tournaments.items():
-            if key in query:
-                parsed["tournament"] = value
-                logger.info(f"Found tournament: {value}")
-                break
-
-        # Extract round using regex with word boundaries
-        # Order matters - check longer patterns first
-        round_patterns = [
-            (r"\b(quarter[- ]?finals?|quarter[- ]?final)\b", "QF"),
-            (r"\b(semi[- ]?finals?|semi[- ]?final)\b", "SF"),
-            (r"\b(finals?)\b", "F"),  # Only match 'final' if not part of quarter/semi
-            (r"\b(fourth[- ]?rounds?|round[- ]?of[- ]?16|r16)\b", "R16"),
-            (r"\b(third[- ]?rounds?|round[- ]?of[- ]?32|r32)\b", "R32"),
-            (r"\b(second[- ]?rounds?|round[- ]?of[- ]?64|r64)\b", "R64"),
-            (r"\b(first[- ]?rounds?|round[- ]?of[- ]?128|r128)\b", "R128"),
+        return self.parser.parse(query)
+
+    @staticmethod
+    def _merge_by_year(
+        results: List, years: List[int], per_year: Optional[int] = None
+    ) -> List:
+        """De-duplicate by match_id and interleave years by rank.
+
+        Round-robin order keeps every requested year represented when the
+        merged list is truncated to ``limit``. ``per_year`` caps the matches
+        kept from each year.
+        """
+        by_year = {year: [] for year in years}
+        seen = set()
+        for match in results:
+            match_id = match.metadata["match_id"]
+            if match_id in seen:
+                continue
+            seen.add(match_id)
+            by_year.setdefault(match.metadata.get("year"), []).append(match)
+        if per_year is not None:
+            by_year = {year: hits[:per_year] for year, hits in by_year.items()}
+
+        merged = []
+        for rank in range(max((len(v) for v in by_year.values()), default=0)):
+            for year in years:
+                if rank < len(by_year[year]):
+                    merged.append(by_year[year][rank])
+        return merged
+
+    def _exact_matches(self, parsed: Dict) -> Optional[List[ScoredVector]]:
+        """Look up tournament + year + round queries without vector search.
+
+        Head-to-head questions naming two players are answered from the
+        table's player index. Returns None when the query is not fully
+        specified or any requested year has no match in the table.
+        """
+        if self.lookup is None:
+            return None
+        players = parsed.get("players", [])
+        if len(players) == 2 and parsed.get("query_type") == "head_to_head":
+            return self._head_to_head_matches(parsed) or None
+        if not {"tournament", "years", "round"} <= set(parsed):
+            return None
+
+        years = sorted({int(year) for year in parsed["years"]})
+        hits = []
+        for year in years:
+            records = self.lookup.lookup(parsed["tournament"], year, parsed["round"])
+            if not records:
+                return None
+            hits.extend(
+                ScoredVector(match_vector_id(record), 1.0, dict(record))
+                for record in records
+            )
+        return self._merge_by_year(hits, years)
+
+    def _head_to_head_matches(self, parsed: Dict) -> List[ScoredVector]:
+        """Every meeting of the two players, most recent first."""
+        years = {int(year) for year in parsed.get("years", [])}
+        records = [
+            record
+            for record in self.lookup.player_matches(*parsed["players"])
+            if (not years or record["year"] in years)
+            and record["tournament_name"]
+            == parsed.get("tournament", record["tournament_name"])
+            and record["round"] == parsed.get("round", record["round"])
         ]
+        records.sort(key=lambda record: record["year"], reverse=True)
+        return [
+            ScoredVector(match_vector_id(record), 1.0, dict(record))
+            for record in records
+        ]
+
+    async def _semantic_search(
+        self, query: str, parsed: Dict, filter_conditions: Dict, limit: int
+    ) -> List:
+        # Get vector for semantic search
+        with span("embed"):
+            query_vector = await self.embedder.embed_query(query)
 
-        # First try to find explicit round mentions
-        round_found = False
-        for pattern, round_code in round_patterns:
-            if re.search(pattern, query):
-                parsed["round"] = round_code
-                round_found = True
-                logger.info(
-                    f"Found explicit round through regex: {pattern} -> {round_code}"
+        # Years are folded into one filtered query instead of one per year
+        if "years" in parsed and parsed["years"]:
+            years = sorted({int(year) for year in parsed["years"]})
+            logger.debug("Searching for years: %s", years)
+            with span("index_query"):
+                results = await self._run_blocking(
+                    self.index.query,
+                    vector=query_vector,
+                    top_k=limit * len(years),
+                    include_metadata=True,
+                    filter={**filter_conditions, "year": {"$in": years}},
                 )
-                break
-
-        # If no explicit round is mentioned, check if query is about winners/champions
-        if not round_found:
-            winner_patterns = [
-                r"\bwon\b",
-                r"\bwinner\b",
-                r"\bchampion\b",
-                r"\btitle\b",
-                r"\bcrown\b",
-                r"\btriumph\b",
-            ]
-            if any(re.search(pattern, query) for pattern in winner_patterns):
-                parsed["round"] = "F"
-                logger.info(
-                    "No explicit round found, but query is about winners - defaulting to Finals"
+            return self._merge_by_year(results.matches, years)
+        else:
+            # Regular search without year filter
+            with span("index_query"):
+                results = await self._run_blocking(
+                    self.index.query,
+                    vector=query_vector,
+                    top_k=limit,
+                    include_metadata=True,
+                    filter=filter_conditions if filter_conditions else None,
                 )
+            return results.matches
 
-        logger.info(f"Final parsed query: {parsed}")
-        return parsed
+    async def _lexical_search(
+        self, query: str, parsed: Dict, filter_conditions: Dict, limit: int
+    ) -> List:
+        if "years" in parsed and parsed["years"]:
+            years = sorted({int(year) for year in parsed["years"]})
+            with span("lexical"):
+                results = await self._run_blocking(
+                    self.lexical.search,
+                    query,
+                    top_k=limit * len(years),
+                    filter={**filter_conditions, "year": {"$in": years}},
+                )
+            return self._merge_by_year(results, years)
+        with span("lexical"):
+            return await self._run_blocking(
+                self.lexical.search,
+                query,
+                top_k=limit,
+                filter=filter_conditions or None,
+            )
+
+    async def _hybrid_search(
+        self, query: str, parsed: Dict, filter_conditions: Dict, limit: int
+    ) -> List:
+        """Vector search, fused with BM25 results when a lexical index is loaded.
+
+        Both searches run concurrently with the same filters. The lexical
+        ranking goes first so exact names and scores win rank ties.
+        """
+        if self.lexical is None:
+            return await self._semantic_search(query, parsed, filter_conditions, limit)
+        lexical, semantic = await asyncio.gather(
+            self._lexical_search(query, parsed, filter_conditions, limit),
+            self._semantic_search(query, parsed, filter_conditions, limit),
+        )
+        fused = reciprocal_rank_fusion([lexical, semantic], self.fusion_k)
+        if "years" in parsed and parsed["years"]:
+            return self._merge_by_year(
+                fused, sorted({int(year) for year in parsed["years"]})
+            )
+        return fused
 
     async def search_matches(
         self, query: str, limit: int = 5
     ) -> tuple[List[Dict], Dict]:
-        """Enhanced search with field filtering and semantic ranking."""
-        logger.info(f"\nSearching for: {query}")
+        """Enhanced search with field filtering and semantic ranking.
+
+        Concurrent calls for the same normalized query and limit are
+        coalesced and share one result; callers must not mutate it.
+        """
+        return await self.search_flights.do(
+            (normalize_query(query), limit),
+            lambda: self._search_matches(query, limit),
+        )
+
+    async def _search_matches(self, query: str, limit: int) -> tuple[List[Dict], Dict]:
+        started = time.perf_counter()
+        logger.debug("Searching for: %s", query)
 
         # Step 1: Parse query for specific fields
-        parsed = self._parse_query(query)
-        logger.info(f"Parsed query parameters: {parsed}")
+        with span("parse"):
+            parsed = self._parse_query(query)
+        logger.debug("Parsed query parameters: %s", parsed)
 
         # Step 2: Build Pinecone filter
         filter_conditions = {}
@@ -163,73 +514,93 @@ class TennisVectorStore:
             filter_conditions["tournament_name"] = {"$eq": parsed["tournament"]}
         if "round" in parsed:
             filter_conditions["round"] = {"$eq": parsed["round"]}
-            logger.info(f"Adding round filter: {parsed['round']}")
-
-        logger.info(f"Filter conditions: {filter_conditions}")
-
-        # Step 3: Get vector for semantic search
-        response = await self.openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=query,
-        )
-        query_vector = response.data[0].embedding
+        players = parsed.get("players", [])
+        if len(players) == 2 and parsed.get("query_type") == "head_to_head":
+            a, b = players
+            filter_conditions["$or"] = [
+                {"winner_name": {"$eq": a}, "loser_name": {"$eq": b}},
+                {"winner_name": {"$eq": b}, "loser_name": {"$eq": a}},
+            ]
+        elif players:
+            filter_conditions["$or"] = [
+                {"winner_name": {"$in": players}},
+                {"loser_name": {"$in": players}},
+            ]
 
-        all_matches = []
+        logger.debug("Filter conditions: %s", filter_conditions)
 
-        # If we have multiple years, search for each year
-        if "years" in parsed and parsed["years"]:
-            for year in parsed["years"]:
-                logger.info(f"Searching for year: {year}")
-                # Get results without year filter first
-                results = self.index.query(
-                    vector=query_vector,
-                    top_k=100,  # Get more results to filter
-                    include_metadata=True,
-                    filter=filter_conditions if filter_conditions else None,
+        # Step 3: Answer fully specified lookups from the keyed table, and
+        # only fall back to semantic search for fuzzy queries
+        with span("exact_lookup"):
+            all_matches = self._exact_matches(parsed)
+        if all_matches is None:
+            # The reranker picks from a wider candidate set than ``limit``
+            depth = (
+                limit if self.reranker is None else max(limit, self.reranker.candidates)
+            )
+            all_matches = await self._hybrid_search(
+                query, parsed, filter_conditions, depth
+            )
+            if not all_matches and "$or" in filter_conditions:
+                # A surname may have resolved to the wrong player
+                logger.debug("No matches for the player filter, retrying without it")
+                del filter_conditions["$or"]
+                all_matches = await self._hybrid_search(
+                    query, parsed, filter_conditions, depth
                 )
-
-                # Filter matches for the specific year using the match_id format
-                year_matches = [
-                    match
-                    for match in results.matches
-                    if match.metadata["match_id"].startswith(
-                        year
-                    )  # Match IDs start with the year
-                ]
-                logger.info(f"Found {len(year_matches)} matches for year {year}")
-                all_matches.extend(year_matches)
+            if self.reranker is not None:
+                # Multi-year questions keep the best ``top_k`` of each year
+                # rather than overall, so no requested year is dropped
+                years = sorted({int(year) for year in parsed.get("years", [])})
+                with span("rerank"):
+                    all_matches = await self.reranker.rerank(
+                        query,
+                        all_matches,
+                        started + self.reranker.deadline,
+                        top_k=self.reranker.candidates if years else None,
+                    )
+                if years:
+                    all_matches = self._merge_by_year(
+                        all_matches, years, per_year=self.reranker.top_k
+                    )
         else:
-            # Regular search without year filter
-            results = self.index.query(
-                vector=query_vector,
-                top_k=limit,
-                include_metadata=True,
-                filter=filter_conditions if filter_conditions else None,
-            )
-            all_matches = results.matches
+            logger.debug("Answered from the exact lookup table")
 
-        logger.info(f"Found {len(all_matches)} total matches")
+        logger.debug("Found %d total matches", len(all_matches))
 
         # Process matches and create analysis
-        matches = []
+        with span("analysis"):
+            matches = []
+            for match in all_matches:
+                # Local index rows are lazy views; materialize only the hits
+                match_data = dict(match.metadata)
+                match_data["similarity"] = match.score
+                matches.append(match_data)
+
+            if self.analytics is not None:
+                # Career records come from the precomputed store, not the hits
+                analysis = await self._run_blocking(
+                    self.analytics.analysis_for, matches[:limit]
+                )
+            else:
+                analysis = self._analysis_from_hits(matches)
+            analysis["total_matches"] = len(matches)
+
+        return matches[:limit], analysis
+
+    def _analysis_from_hits(self, matches: List[Dict]) -> Dict:
+        """Statistics over the retrieved matches only (no analytics store)."""
         tournament_wins = {}
         surface_wins = {}
         head_to_head = {}
 
-        for match in all_matches:
-            match_data = match.metadata
-            match_data["similarity"] = match.score
-
-            # Rest of the processing remains the same...
+        for match_data in matches:
             winner = match_data["winner_name"]
             loser = match_data["loser_name"]
             tournament = match_data["tournament_name"]
             surface = match_data["surface"]
             date = match_data.get("tournament", {}).get("date", "")
 
-            # Add to matches list
-            matches.append(match_data)
-
             # Update statistics
             tournament_wins.setdefault(winner, {}).setdefault(tournament, [])
             tournament_wins[winner][tournament].append(
@@ -253,11 +624,8 @@ class TennisVectorStore:
                 }
             )
 
-        analysis = {
+        return {
             "tournament_wins": tournament_wins,
             "surface_wins": surface_wins,
             "head_to_head": head_to_head,
-            "total_matches": len(matches),
         }
-
-        return matches[:limit], analysis
@@ -0,0 +1,98 @@
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from app.data.ingestion.corpus_cache import ATPCorpusCache
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_store import match_metadata
+
+
+def timed_queries(index: LexicalIndex, queries, top_k: int):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(index.search(query, top_k=top_k))
+        latencies.append(time.perf_counter() - started)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return results, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the BM25 lexical index and time name and score lookups"
+    )
+    parser.add_argument("--data-path", default="tennis_atp")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    records = [
+        match_metadata(match)
+        for match in ATPCorpusCache(args.data_path).load().iter_match_records()
+    ]
+    print(f"{len(records):,} matches from {args.data_path}\n")
+
+    started = time.perf_counter()
+    index = LexicalIndex.build(records)
+    print(f"build                {time.perf_counter() - started:8.2f}s")
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        started = time.perf_counter()
+        index = LexicalIndex.load(tmp)
+        print(f"load                 {time.perf_counter() - started:8.2f}s")
+
+        stats = index.stats()
+        raw = stats["postings"] * 5  # int32 doc id + uint8 frequency
+        print(
+            f"postings             {stats['postings']:,} over {stats['terms']:,} terms"
+        )
+        print(
+            f"posting bytes        {stats['posting_bytes'] / 1e6:8.2f} MB "
+            f"({stats['bytes_per_posting']} B/posting, "
+            f"{raw / stats['posting_bytes']:.1f}x smaller than int32 ids)\n"
+        )
+
+        rng = random.Random(0)
+        sample = rng.sample(records, min(args.queries, len(records)))
+        score_queries = [
+            f"{match['winner_name'].split()[-1]} {match['score']}" for match in sample
+        ]
+        name_queries = [f"{match['loser_name']} matches" for match in sample]
+
+        results, p50, p99 = timed_queries(index, score_queries, args.top_k)
+        # Another match with the same winner and score is an equally exact hit
+        exact = sum(
+            bool(hits)
+            and hits[0].metadata["winner_name"] == match["winner_name"]
+            and hits[0].metadata["score"] == match["score"]
+            for hits, match in zip(results, sample)
+        )
+        print(
+            f"surname + score      p50 {p50:6.2f}ms  p99 {p99:6.2f}ms  "
+            f"exact@1 {exact / len(sample):.1%}"
+        )
+
+        results, p50, p99 = timed_queries(index, name_queries, args.top_k)
+        named = sum(
+            sum(
+                match["loser_name"]
+                in (hit.metadata["winner_name"], hit.metadata["loser_name"])
+                for hit in hits
+            )
+            / max(len(hits), 1)
+            for hits, match in zip(results, sample)
+        )
+        print(
+            f"full player name     p50 {p50:6.2f}ms  p99 {p99:6.2f}ms  "
+            f"precision@{args.top_k} {named / len(sample):.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+from app.data.ingestion.corpus_cache import (
+    ATPCorpusCache,
+    REQUIRED_COLUMNS,
+    STAT_COLUMNS,
+)
+from app.data.ingestion.data_processor import ATPDataProcessor
+
+
+def legacy_ingest_records(df: pd.DataFrame):
+    """Row-by-row record builder the ingest script used before the cache"""
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    for col in ["winner_rank", "loser_rank"] + STAT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].where(pd.notna(df[col]), None)
+
+    matches = []
+    for _, row in df.iterrows():
+        description = (
+            f"{row['winner_name']} defeated {row['loser_name']} \n"
+            f"        in the {row['round']} of {row['tourney_name']} "
+            f"{row['tourney_date']} \n"
+            f"        on {row['surface']} courts with a score of {row['score']}.\n"
+            f"        Tournament level: {row['tourney_level']}."
+        )
+        if pd.notna(row.get("winner_aces")):
+            description += (
+                f"\n         {row['winner_name']} served {row['winner_aces']} aces."
+            )
+
+        matches.append(
+            {
+                "match_id": f"{row['tourney_id']}_{row.get('match_num', 0)}",
+                "description": description,
+                "tournament": {
+                    "name": str(row["tourney_name"]),
+                    "date": str(row["tourney_date"]),
+                    "level": str(row["tourney_level"]),
+                    "surface": str(row["surface"]),
+                },
+                "players": {
+                    side: {
+                        "name": str(row[f"{side}_name"]),
+                        "id": (
+                            str(row[f"{side}_id"])
+                            if pd.notna(row.get(f"{side}_id"))
+                            else None
+                        ),
+                        "rank": (
+                            int(row[f"{side}_rank"])
+                            if pd.notna(row.get(f"{side}_rank"))
+                            else None
+                        ),
+                    }
+                    for side in ("winner", "loser")
+                },
+                "score": str(row["score"]),
+                "round": str(row["round"]),
+                "stats": {
+                    col: float(row[col]) if pd.notna(row.get(col)) else None
+                    for col in STAT_COLUMNS
+                    if col in row
+                },
+            }
+        )
+    return matches
+
+
+def legacy_processor_records(processor: ATPDataProcessor, df: pd.DataFrame):
+    """Row-by-row ATPDataProcessor.process_match_data before vectorizing"""
+    matches = []
+    for _, row in df.iterrows():
+        winner = {
+            "name": f"{row['winner_name']}",
+            "id": row["winner_id"],
+            "rank": row["winner_rank"] if pd.notna(row["winner_rank"]) else None,
+        }
+        loser = {
+            "name": f"{row['loser_name']}",
+            "id": row["loser_id"],
+            "rank": row["loser_rank"] if pd.notna(row["loser_rank"]) else None,
+        }
+        date = str(row["tourney_date"])
+        surface = processor.surface_mapping.get(row["surface"], "unknown")
+        description = (
+            f"{winner['name']} defeated {loser['name']} "
+            f"in the {row['round']} of {row['tourney_name']} "
+            f"({date[:4]}) on {surface} "
+            f"with a score of {row['score']}. "
+        )
+        if winner["rank"] and loser["rank"]:
+            description += (
+                f"At the time, {winner['name']} was ranked #{winner['rank']} "
+                f"while {loser['name']} was #{loser['rank']}."
+            )
+        matches.append(
+            {
+                "match_id": f"{row['tourney_id']}_{row['match_num']}",
+                "tournament": {
+                    "name": row["tourney_name"],
+                    "date": date,
+                    "surface": surface,
+                    "level": row["tourney_level"],
+                },
+                "players": {"winner": winner, "loser": loser},
+                "score": row["score"],
+                "stats": {
+                    col: row[col]
+                    for col in processor.stat_columns
+                    if col in row and pd.notna(row[col])
+                },
+                "round": row["round"],
+                "description": description,
+            }
+        )
+    return matches
+
+
+def timed(label: str, fn, rows: int):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed:8.2f}s  {rows / elapsed:>12,.0f} rows/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the vectorized match record builders with iterrows"
+    )
+    parser.add_argument("--data-path", default="tennis_atp")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Concatenate the corpus this many times to simulate a larger one",
+    )
+    args = parser.parse_args()
+
+    files = sorted(Path(args.data_path).glob("atp_matches_????.csv"))
+    if not files:
+        sys.exit(f"No ATP match files found in {args.data_path}")
+    df = pd.concat([pd.read_csv(file) for file in files] * args.repeat)
+    df = df.reset_index(drop=True)
+    print(f"{len(df):,} matches from {len(files)} files (x{args.repeat})\n")
+
+    # Ingest records: iterrows vs the columnar corpus cache
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, file in enumerate(files * args.repeat):
+            target = Path(tmp) / f"atp_matches_{1000 + i}.csv"
+            target.symlink_to(file.resolve())
+        cache = ATPCorpusCache(tmp)
+        timed("corpus cache build", cache.build, len(df))
+        corpus = cache.load()
+
+        legacy, legacy_time = timed(
+            "ingest records (iterrows)", lambda: legacy_ingest_records(df), len(df)
+        )
+        fast, fast_time = timed(
+            "ingest records (vectorized)",
+            lambda: list(corpus.iter_match_records()),
+            len(df),
+        )
+        print(
+            f"  identical: {legacy == fast}, speedup {legacy_time / fast_time:.1f}x\n"
+        )
+
+    # ATPDataProcessor records
+    processor = ATPDataProcessor()
+    legacy, legacy_time = timed(
+        "processor records (iterrows)",
+        lambda: legacy_processor_records(processor, df),
+        len(df),
+    )
+    fast, fast_time = timed(
+        "processor records (vectorized)",
+        lambda: processor.process_match_data(df),
+        len(df),
+    )
+    print(
+        f"  identical: {repr(legacy) == repr(fast)}, "
+        f"speedup {legacy_time / fast_time:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
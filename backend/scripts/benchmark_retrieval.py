@@ -0,0 +1,379 @@
+"""Offline retrieval benchmark.
+
+Ingests a sample of the ATP CSVs into a local index with a local embedder,
+then measures ingestion throughput, retrieval latency and recall@k on a
+labeled question set generated from the sample, and end-to-end
+``/api/query`` QPS and latency at fixed concurrency against a stub LLM.
+Nothing leaves the machine, so results are comparable between runs;
+they are written as JSON and can be diffed against a baseline file.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Every request should run the full pipeline
+os.environ["ANSWER_CACHE_SIZE"] = "0"
+
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+from app.data.ingestion.corpus_cache import ATPCorpusCache
+from app.main import app
+from app.services.analytics_store import build_analytics
+from app.services.container import ServiceContainer
+from app.services.embedder import Embedder, LocalEmbedder
+from app.services.lexical_index import LexicalIndex
+from app.services.local_index import LocalVectorIndex
+from app.services.match_lookup import MatchLookupTable
+from app.services.metrics import STAGE_SECONDS
+from app.services.vector_store import TennisVectorStore, match_metadata
+from stub_services import StubCompletionServer, hash_embedding
+
+# Per-request INFO logs would dominate the timings
+logging.getLogger().setLevel(logging.WARNING)
+
+GRAND_SLAMS = ["Australian Open", "Roland Garros", "Wimbledon", "US Open"]
+
+
+class HashEmbedder(Embedder):
+    """Deterministic feature-hashing embedder: no model download, no API"""
+
+    model_name = "hash-256"
+    dimension = 256
+    remote = False
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [hash_embedding(text, self.dimension) for text in texts]
+
+
+def sample_data(data_path: Path, target: Path, start_year: int, end_year: int):
+    """Link the selected years (and the player list) into ``target``"""
+    files = [
+        data_path / f"atp_matches_{year}.csv"
+        for year in range(start_year, end_year + 1)
+        if (data_path / f"atp_matches_{year}.csv").exists()
+    ]
+    if not files:
+        sys.exit(f"No ATP match files for {start_year}-{end_year} in {data_path}")
+    for file in files + [data_path / "atp_players.csv"]:
+        if file.exists():
+            (target / file.name).symlink_to(file.resolve())
+    return len(files)
+
+
+def labeled_queries(records: List[Dict], score_queries: int, seed: int) -> List[Dict]:
+    """Questions with the match IDs a correct retrieval must return"""
+    queries = []
+    events = defaultdict(list)
+    meetings = defaultdict(list)
+    results = defaultdict(list)
+    for record in records:
+        events[(record["tournament_name"], record["year"], record["round"])].append(
+            record["match_id"]
+        )
+        pair = tuple(sorted((record["winner_name"], record["loser_name"])))
+        meetings[pair].append(record["match_id"])
+        results[(record["winner_name"], record["score"])].append(record["match_id"])
+
+    for (tournament, year, round), match_ids in sorted(events.items()):
+        if tournament not in GRAND_SLAMS:
+            continue
+        if round == "F":
+            question = f"Who won {tournament} in {year}?"
+            queries.append(_label("final", question, match_ids))
+        elif round == "SF":
+            question = f"Who played in the semifinals of {tournament} {year}?"
+            queries.append(_label("semifinal", question, match_ids))
+
+    rng = random.Random(seed)
+    for record in rng.sample(records, min(score_queries, len(records))):
+        question = f"{record['winner_name'].split()[-1]} {record['score']}"
+        # Any match the same player won by the same score answers it
+        expected = results[(record["winner_name"], record["score"])]
+        queries.append(_label("score", question, expected))
+
+    rivalries = sorted(
+        (pair for pair, match_ids in meetings.items() if len(match_ids) >= 3),
+        key=lambda pair: (-len(meetings[pair]), pair),
+    )
+    for a, b in rivalries[:score_queries]:
+        queries.append(_label("head_to_head", f"{a} vs {b}", meetings[(a, b)]))
+    return queries
+
+
+def _label(category: str, query: str, match_ids: List[str]) -> Dict:
+    return {"category": category, "query": query, "expected": sorted(match_ids)}
+
+
+def percentiles(latencies: List[float]) -> Dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(p95, 2),
+        "p99_ms": round(p99, 2),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 2),
+    }
+
+
+async def ingest(records: List[Dict], raw_records, frame, embedder, tmp: Path):
+    """Build everything the ingest script builds, timing each part"""
+    results = {"matches": len(records)}
+
+    store = TennisVectorStore(index=LocalVectorIndex(tmp / "index"), embedder=embedder)
+    stats = await store.store_matches(raw_records())
+    store.flush()
+    results["vector_seconds"] = stats["seconds"]
+    results["matches_per_sec"] = stats["matches_per_sec"]
+
+    started = time.perf_counter()
+    MatchLookupTable(records).save(tmp / "match_lookup.json.gz")
+    results["lookup_seconds"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    lexical = LexicalIndex.build(records)
+    lexical.save(tmp / "lexical_index")
+    results["lexical_seconds"] = round(time.perf_counter() - started, 3)
+    results["lexical_bytes_per_posting"] = lexical.stats()["bytes_per_posting"]
+
+    started = time.perf_counter()
+    build_analytics(frame, tmp / "analytics.sqlite")
+    results["analytics_seconds"] = round(time.perf_counter() - started, 3)
+    return results
+
+
+async def measure_retrieval(container: ServiceContainer, queries: List[Dict], k: int):
+    """Sequential search_matches calls: latency and recall@k per category"""
+    latencies = []
+    recall = defaultdict(list)
+    started = time.perf_counter()
+    for item in queries:
+        query_started = time.perf_counter()
+        matches, _ = await container.vector_store.search_matches(item["query"], k)
+        latencies.append(time.perf_counter() - query_started)
+        found = {match["match_id"] for match in matches[:k]}
+        expected = set(item["expected"])
+        recall[item["category"]].append(len(found & expected) / min(len(expected), k))
+    elapsed = time.perf_counter() - started
+
+    by_category = {
+        category: round(float(np.mean(values)), 4)
+        for category, values in sorted(recall.items())
+    }
+    every = [value for values in recall.values() for value in values]
+    return {
+        "queries": len(queries),
+        "qps": round(len(queries) / elapsed, 1),
+        **percentiles(latencies),
+        f"recall@{k}": {"all": round(float(np.mean(every)), 4), **by_category},
+        "queries_per_category": {
+            category: len(values) for category, values in sorted(recall.items())
+        },
+    }
+
+
+async def measure_end_to_end(
+    client: httpx.AsyncClient, queries: List[Dict], concurrency: int, requests: int
+):
+    """Keep ``concurrency`` /api/query requests in flight"""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            # Distinct text per request, so no cache or coalescing helps
+            query = f"{queries[i % len(queries)]['query']} #{i}"
+            started = time.perf_counter()
+            response = await client.post("/api/query", json={"query": query})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "qps": round(requests / elapsed, 1),
+        **percentiles(latencies),
+    }
+
+
+def stage_means() -> Dict:
+    return {
+        stage: {"count": count, "mean_ms": round(total / count * 1000, 3)}
+        for (stage,), (count, total) in sorted(STAGE_SECONDS.totals().items())
+        if count
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}{key}."))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix[:-1]: value}
+    return {}
+
+
+def compare(results: Dict, baseline: Dict):
+    """Print every numeric result next to the baseline's"""
+    before = flatten({k: v for k, v in baseline.items() if k != "config"})
+    after = flatten({k: v for k, v in results.items() if k != "config"})
+    print(f"\n{'metric':<48} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, value in after.items():
+        if key not in before or key.startswith("stages."):
+            continue
+        old = before[key]
+        change = f"{(value - old) / old * 100:+.1f}%" if old else "-"
+        print(f"{key:<48} {old:>10} {value:>10} {change:>8}")
+
+
+async def run(args):
+    embedder = LocalEmbedder() if args.embedder == "local" else HashEmbedder()
+    with tempfile.TemporaryDirectory() as tmp, StubCompletionServer(
+        first_token_latency=args.llm_latency, token_latency=0.0
+    ) as llm:
+        tmp = Path(tmp)
+        data = tmp / "atp"
+        data.mkdir()
+        files = sample_data(Path(args.data_path), data, args.start_year, args.end_year)
+        corpus = ATPCorpusCache(data).load()
+        records = [match_metadata(match) for match in corpus.iter_match_records()]
+        print(f"{len(records):,} matches from {files} files\n")
+
+        ingestion = await ingest(
+            records, corpus.iter_match_records, corpus.to_frame(), embedder, tmp
+        )
+        print(
+            f"ingestion     {ingestion['matches_per_sec']:>10,.1f} matches/s "
+            f"(lookup {ingestion['lookup_seconds']}s, "
+            f"lexical {ingestion['lexical_seconds']}s, "
+            f"analytics {ingestion['analytics_seconds']}s)"
+        )
+
+        # The container reads the offline artifacts like it would in production
+        os.environ.update(
+            {
+                "MATCH_LOOKUP_PATH": str(tmp / "match_lookup.json.gz"),
+                "ANALYTICS_PATH": str(tmp / "analytics.sqlite"),
+                "LEXICAL_INDEX_PATH": str(tmp / "lexical_index"),
+                "ATP_DATA_PATH": str(data),
+                "INGEST_MANIFEST_PATH": str(tmp / "no_manifest.sqlite"),
+            }
+        )
+        openai = AsyncOpenAI(api_key="stub", base_url=llm.base_url, max_retries=0)
+        container = ServiceContainer(
+            openai_client=openai,
+            index=LocalVectorIndex.load(tmp / "index"),
+            embedder=embedder,
+        )
+        await container.start()
+        app.state.container = container
+
+        try:
+            queries = labeled_queries(records, args.score_queries, args.seed)
+            retrieval = await measure_retrieval(container, queries, args.k)
+            recall = retrieval[f"recall@{args.k}"]
+            print(
+                f"retrieval     {retrieval['qps']:>10,.1f} queries/s  "
+                f"p50 {retrieval['p50_ms']}ms  p95 {retrieval['p95_ms']}ms  "
+                f"p99 {retrieval['p99_ms']}ms"
+            )
+            print(
+                f"recall@{args.k:<6} "
+                + "  ".join(
+                    f"{category} {value:.3f}" for category, value in recall.items()
+                )
+            )
+
+            end_to_end = {}
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://benchmark",
+                timeout=120,
+            ) as client:
+                for concurrency in args.concurrency:
+                    result = await measure_end_to_end(
+                        client,
+                        queries,
+                        concurrency,
+                        max(args.requests, concurrency * 4),
+                    )
+                    end_to_end[str(concurrency)] = result
+                    print(
+                        f"/api/query x{concurrency:<4} {result['qps']:>7,.1f} QPS  "
+                        f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  "
+                        f"p99 {result['p99_ms']}ms"
+                    )
+        finally:
+            await container.aclose()
+
+    return {
+        "config": {
+            "commit": git_commit(),
+            "data_path": args.data_path,
+            "years": [args.start_year, args.end_year],
+            "embedder": embedder.model_name,
+            "k": args.k,
+            "llm_latency": args.llm_latency,
+            "seed": args.seed,
+        },
+        "ingestion": ingestion,
+        "retrieval": retrieval,
+        "end_to_end": end_to_end,
+        "stages": stage_means(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline ingestion, latency and recall benchmark with stub services"
+    )
+    parser.add_argument("--data-path", default="tennis_atp")
+    parser.add_argument("--start-year", type=int, default=2015)
+    parser.add_argument("--end-year", type=int, default=2019)
+    parser.add_argument("--embedder", choices=["hash", "local"], default="hash")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--score-queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
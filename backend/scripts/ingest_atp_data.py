@@ -4,7 +4,7 @@ import os
 import logging
 from datetime import datetime
 from tqdm import tqdm
-import pandas as pd
+import numpy as np
 import subprocess
 import shutil
 import time
@@ -15,7 +15,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.data.ingestion.atp_data_loader import ATPDataLoader
 from app.data.ingestion.data_processor import ATPDataProcessor
-from app.services.vector_store import TennisVectorStore
+from app.data.ingestion.corpus_cache import ATPCorpusCache, CorpusColumns
+from app.data.ingestion.manifest import IngestionManifest
+from app.services.embedder import create_embedder
+from app.services.analytics_store import ANALYTICS_COLUMNS, build_analytics
+from app.services.match_lookup import MatchLookupTable
+from app.services.match_table import MatchTable
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_store import (
+    TennisVectorStore,
+    index_target,
+    match_metadata,
+)
 
 
 # Configure logging
@@ -31,6 +42,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Records built per step of the stream; small chunks keep the embedding
+# pipeline fed without holding a large slice of the corpus
+RECORD_CHUNK_SIZE = 1000
+
 
 def download_tennis_data(data_path: Path):
     """Download tennis data if not present"""
@@ -56,185 +71,59 @@ def download_tennis_data(data_path: Path):
         raise
 
 
-def print_dataset_stats(df: pd.DataFrame):
+def print_dataset_stats(corpus: CorpusColumns):
     """Print interesting statistics about the dataset"""
+    # Computed column by column on the cached codes, never as a full frame
+    total = len(corpus)
+    dates = corpus.values("tourney_date")
     logger.info("\n=== Dataset Statistics ===")
-    logger.info(f"Total matches: {len(df):,}")
-    logger.info(f"Date range: {df['tourney_date'].min()} to {df['tourney_date'].max()}")
-    logger.info(f"Unique tournaments: {df['tourney_name'].nunique():,}")
-    logger.info(
-        f"Unique players: {len(set(df['winner_name'].unique()) | set(df['loser_name'].unique())):,}"
-    )
+    logger.info(f"Total matches: {total:,}")
+    logger.info(f"Date range: {dates.min()} to {dates.max()}")
+    logger.info(f"Unique tournaments: {len(_distinct(corpus, 'tourney_name')):,}")
+    players = _distinct(corpus, "winner_name") | _distinct(corpus, "loser_name")
+    logger.info(f"Unique players: {len(players):,}")
 
     # Surface distribution
-    surface_dist = df["surface"].value_counts()
     logger.info("\nSurface Distribution:")
-    for surface, count in surface_dist.items():
-        logger.info(f"{surface}: {count:,} matches ({count/len(df)*100:.1f}%)")
+    for surface, count in _value_counts(corpus, "surface"):
+        logger.info(f"{surface}: {count:,} matches ({count/total*100:.1f}%)")
 
     # Tournament level distribution
-    level_dist = df["tourney_level"].value_counts()
     logger.info("\nTournament Level Distribution:")
-    for level, count in level_dist.items():
-        logger.info(f"{level}: {count:,} matches ({count/len(df)*100:.1f}%)")
+    for level, count in _value_counts(corpus, "tourney_level"):
+        logger.info(f"{level}: {count:,} matches ({count/total*100:.1f}%)")
 
 
-async def load_tennis_data() -> List[Dict]:
-    """Load and process ALL tennis match data"""
-    # Read all ATP match files
-    dfs = []
-    data_path = Path("tennis_atp")
+def _distinct(corpus: CorpusColumns, col: str) -> set:
+    codes = np.unique(corpus.values(col))
+    return set(corpus.vocabs[col][codes[codes >= 0]])
+
+
+def _value_counts(corpus: CorpusColumns, col: str):
+    codes = corpus.values(col)
+    counts = np.bincount(codes[codes >= 0], minlength=len(corpus.vocabs[col]) - 1)
+    for code in np.argsort(-counts, kind="stable"):
+        if counts[code]:
+            yield corpus.vocabs[col][code], int(counts[code])
 
-    # Add debug logging
-    logger.info("Starting to read ATP match files...")
-
-    for file in sorted(data_path.glob("atp_matches_????.csv")):
-        logger.info(f"Reading {file.name}...")
-        df = pd.read_csv(file)
-        # Debug: Print sample data
-        if len(dfs) == 0:  # First file
-            logger.info("Sample row from first file:")
-            logger.info(
-                df.iloc[0][
-                    ["tourney_date", "tourney_name", "winner_name", "round"]
-                ].to_dict()
-            )
-        dfs.append(df)
 
-    # Combine all data
-    df = pd.concat(dfs, ignore_index=True)
-    logger.info(f"Total matches found: {len(df):,}")
+async def load_tennis_data() -> CorpusColumns:
+    """Load ALL tennis match data as memory-mapped columns"""
+    data_path = Path("tennis_atp")
+
+    # The CSVs are parsed once, file by file, into a memory-mapped columnar
+    # cache; later runs reuse it unless a source file changed
+    logger.info("Loading ATP corpus cache...")
+    corpus = ATPCorpusCache(data_path).load()
+    logger.info(f"Matches after cleaning: {len(corpus):,}")
 
     # Print dataset statistics before processing
-    print_dataset_stats(df)
-
-    # Basic cleaning and handling NaN values
-    required_columns = [
-        "winner_name",
-        "loser_name",
-        "score",
-        "tourney_name",
-        "surface",
-        "round",
-        "tourney_level",
-    ]
-    df = df.dropna(subset=required_columns)
-
-    # Replace NaN with None in optional columns
-    optional_columns = [
-        "winner_rank",
-        "loser_rank",
-        "winner_aces",
-        "winner_df",
-        "winner_svpt",
-        "winner_1stIn",
-        "winner_1stWon",
-        "winner_2ndWon",
-        "winner_SvGms",
-        "winner_bpSaved",
-        "winner_bpFaced",
-        "loser_aces",
-        "loser_df",
-        "loser_svpt",
-        "loser_1stIn",
-        "loser_1stWon",
-        "loser_2ndWon",
-        "loser_SvGms",
-        "loser_bpSaved",
-        "loser_bpFaced",
-    ]
-
-    for col in optional_columns:
-        if col in df.columns:
-            df[col] = df[col].where(pd.notna(df[col]), None)
-
-    logger.info(f"Matches after cleaning: {len(df):,}")
-
-    matches = []
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Processing matches"):
-        # Skip if any required field is missing
-        if any(pd.isna(row[col]) for col in required_columns):
-            continue
-
-        # Create a detailed description for better semantic search
-        description = f"""
-        {row['winner_name']} defeated {row['loser_name']} 
-        in the {row['round']} of {row['tourney_name']} {row['tourney_date']} 
-        on {row['surface']} courts with a score of {row['score']}.
-        Tournament level: {row['tourney_level']}.
-        """
-        if pd.notna(row.get("winner_aces")):
-            description += f" {row['winner_name']} served {row['winner_aces']} aces."
-
-        # Create match data with clean values
-        match = {
-            "match_id": f"{row['tourney_id']}_{row.get('match_num', 0)}",
-            "description": description.strip(),
-            "tournament": {
-                "name": str(row["tourney_name"]),
-                "date": str(row["tourney_date"]),
-                "level": str(row["tourney_level"]),
-                "surface": str(row["surface"]),
-            },
-            "players": {
-                "winner": {
-                    "name": str(row["winner_name"]),
-                    "id": (
-                        str(row["winner_id"])
-                        if pd.notna(row.get("winner_id"))
-                        else None
-                    ),
-                    "rank": (
-                        int(row["winner_rank"])
-                        if pd.notna(row.get("winner_rank"))
-                        else None
-                    ),
-                },
-                "loser": {
-                    "name": str(row["loser_name"]),
-                    "id": (
-                        str(row["loser_id"]) if pd.notna(row.get("loser_id")) else None
-                    ),
-                    "rank": (
-                        int(row["loser_rank"])
-                        if pd.notna(row.get("loser_rank"))
-                        else None
-                    ),
-                },
-            },
-            "score": str(row["score"]),
-            "round": str(row["round"]),
-            "stats": {
-                col: float(row[col]) if pd.notna(row.get(col)) else None
-                for col in [
-                    "winner_aces",
-                    "winner_df",
-                    "winner_svpt",
-                    "winner_1stIn",
-                    "winner_1stWon",
-                    "winner_2ndWon",
-                    "winner_SvGms",
-                    "winner_bpSaved",
-                    "winner_bpFaced",
-                    "loser_aces",
-                    "loser_df",
-                    "loser_svpt",
-                    "loser_1stIn",
-                    "loser_1stWon",
-                    "loser_2ndWon",
-                    "loser_SvGms",
-                    "loser_bpSaved",
-                    "loser_bpFaced",
-                ]
-                if col in row
-            },
-        }
-        matches.append(match)
-
-    return matches
-
-
-async def main():
+    print_dataset_stats(corpus)
+
+    return corpus
+
+
+async def main(full: bool = False):
     try:
         logger.info("Starting tennis data ingestion process...")
 
@@ -244,24 +133,86 @@ async def main():
 
         # Load ALL matches
         logger.info("Loading ATP match data...")
-        matches = await load_tennis_data()  # This function already loads all matches
-
-        logger.info(f"Processed {len(matches):,} matches")
+        corpus = await load_tennis_data()
+
+        # The model is loaded first so its dimension is known
+        embedder = create_embedder()
+        await embedder.warm()
+
+        # Only new or changed matches need embedding; the manifest remembers
+        # what earlier (possibly interrupted) runs already stored, in which
+        # index and with which model, so switching VECTOR_BACKEND or
+        # EMBEDDING_BACKEND re-embeds every match
+        manifest = IngestionManifest(
+            os.getenv("INGEST_MANIFEST_PATH", data_path / ".ingest_manifest.sqlite"),
+            target=index_target(embedder),
+        )
+        if full:
+            logger.info("Full re-ingestion requested, clearing manifest")
+            manifest.reset()
 
-        # Store matches with progress bar
+        # Records stream from the cache through the manifest check into the
+        # embedding pipeline, so only the batches in flight are in memory
         logger.info("\nStoring matches in vector database...")
-        batch_size = 100
-        vector_store = TennisVectorStore()
-
-        with tqdm(total=len(matches), desc="Storing matches") as pbar:
-            for i in range(0, len(matches), batch_size):
-                batch = matches[i : i + batch_size]
-                await vector_store.store_matches(batch)
+        vector_store = TennisVectorStore(embedder=embedder)
+        in_flight: Dict[str, tuple] = {}
+
+        # The number of changed matches is only known once the stream ends
+        with tqdm(desc="Storing matches", unit=" matches") as pbar:
+
+            def pending_matches():
+                records = corpus.iter_match_records(chunk_size=RECORD_CHUNK_SIZE)
+                for entry in manifest.iter_pending(records):
+                    in_flight[entry[0]["match_id"]] = entry
+                    yield entry[0]
+
+            def checkpoint(batch: List[Dict]):
+                manifest.checkpoint(
+                    [in_flight.pop(match["match_id"]) for match in batch]
+                )
                 pbar.update(len(batch))
 
+            stats = await vector_store.store_matches(
+                pending_matches(), on_batch=checkpoint
+            )
+        vector_store.flush()
+        vector_store.close()
+
+        # The derived tables are built once the vectors are stored, each
+        # from chunks of the memory-mapped cache. Match metadata is encoded
+        # into one columnar table as it streams; the lookup table and the
+        # lexical index share it
+        logger.info("\nBuilding lookup tables...")
+        metadata = MatchTable.from_records(
+            match_metadata(match)
+            for match in corpus.iter_match_records(chunk_size=RECORD_CHUNK_SIZE)
+        )
+
+        # Keyed tables for exact tournament/year/round lookups at query time
+        MatchLookupTable(metadata).save(
+            os.getenv("MATCH_LOOKUP_PATH", "data/match_lookup.json.gz")
+        )
+
+        # BM25 index over the descriptions, fused with vector search so
+        # exact names and scores rank reliably
+        LexicalIndex.build(metadata).save(
+            os.getenv("LEXICAL_INDEX_PATH", "data/lexical_index")
+        )
+
+        # Career head-to-head, tournament/surface records and titles over
+        # the full dataset, so the query path never aggregates retrieved hits
+        build_analytics(
+            corpus.iter_frames(ANALYTICS_COLUMNS),
+            os.getenv("ANALYTICS_PATH", "data/analytics.sqlite"),
+        )
+
         logger.info("\n=== Ingestion Summary ===")
-        logger.info(f"Total matches ingested: {len(matches):,}")
+        logger.info(f"Total matches ingested: {stats['matches']:,}")
+        logger.info(f"Already stored: {len(corpus) - stats['matches']:,}")
+        logger.info(f"Throughput: {stats['matches_per_sec']:,} matches/sec")
+        logger.info(f"Total matches in index: {manifest.count():,}")
         logger.info("Ingestion completed successfully!")
+        manifest.close()
 
     except Exception as e:
         logger.error(f"Error during ingestion: {str(e)}", exc_info=True)
@@ -269,8 +220,17 @@ async def main():
 
 
 if __name__ == "__main__":
+    import argparse
     import asyncio
 
+    parser = argparse.ArgumentParser(description="Ingest ATP matches")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the ingestion manifest and re-embed every match",
+    )
+    args = parser.parse_args()
+
     # Print ASCII art banner
     print(
         """
@@ -281,4 +241,4 @@ if __name__ == "__main__":
     """
     )
 
-    asyncio.run(main())
+    asyncio.run(main(full=args.full))
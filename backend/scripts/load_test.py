@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Every request should reach the index: no answer cache, distinct queries
+os.environ["ANSWER_CACHE_SIZE"] = "0"
+
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+from app.main import app
+from app.services.container import ServiceContainer
+from app.services.local_index import LocalVectorIndex
+from stub_services import StubCompletionServer
+from test_streaming import build_index
+
+# Per-request INFO logs would dominate the timings
+logging.getLogger().setLevel(logging.WARNING)
+
+
+class SlowIndex:
+    """Local index with a blocking network-like delay on every query"""
+
+    def __init__(self, index: LocalVectorIndex, latency: float):
+        self.index = index
+        self.latency = latency
+
+    def query(self, **kwargs):
+        time.sleep(self.latency)
+        return self.index.query(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, requests: int):
+    """Keep ``concurrency`` requests in flight until ``requests`` are done"""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/query", json={"query": f"Who played at Wimbledon in 2019 #{i}"}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "qps": requests / elapsed,
+        "p50": p50,
+        "p95": p95,
+        "p99": p99,
+    }
+
+
+async def load_test(args):
+    with StubCompletionServer(
+        first_token_latency=args.llm_latency, token_latency=0.0
+    ) as llm, tempfile.TemporaryDirectory() as tmp:
+        openai = AsyncOpenAI(api_key="stub", base_url=llm.base_url, max_retries=0)
+        await build_index(tmp, openai)
+        index = SlowIndex(LocalVectorIndex.load(tmp), args.index_latency)
+
+        for threads in (0, args.threads):
+            label = "inline (blocking)" if threads == 0 else f"{threads} threads"
+            print(f"\nIndex queries {label}, {args.index_latency * 1000:.0f}ms each")
+            print(f"{'concurrency':>11} {'QPS':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+
+            container = ServiceContainer(openai_client=openai, index=index)
+            container.vector_store.query_threads = threads
+            app.state.container = container
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://test",
+                timeout=120,
+            ) as client:
+                for concurrency in args.concurrency:
+                    result = await run_level(
+                        client, concurrency, max(args.requests, concurrency * 4)
+                    )
+                    print(
+                        f"{concurrency:>11} {result['qps']:>8.1f} "
+                        f"{result['p50']:>6.0f}ms {result['p95']:>6.0f}ms "
+                        f"{result['p99']:>6.0f}ms"
+                    )
+            container.vector_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency under concurrency with blocking vs pooled index queries"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--index-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--threads", type=int, default=16)
+    asyncio.run(load_test(parser.parse_args()))
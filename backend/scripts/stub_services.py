@@ -0,0 +1,290 @@
+"""Local stand-ins for the OpenAI embeddings and chat APIs and the Pinecone index.
+
+The servers speak just enough of each HTTP API for the ingestion and query
+paths to run offline. They can inject latency and 429 responses so the
+pipeline's concurrency and back-off behaviour can be exercised locally.
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+
+def hash_embedding(text: str, dimension: int) -> List[float]:
+    """Deterministic bag-of-words embedding using feature hashing."""
+    vector = [0.0] * dimension
+    for token in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        slot = int.from_bytes(digest[:4], "little") % dimension
+        vector[slot] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 refuses connections when a load test
+    # opens dozens at once, and clients built with max_retries=0 fail on it
+    request_queue_size = 1024
+
+
+class _StubServer:
+    """Run a handler class on a background ThreadingHTTPServer."""
+
+    def __init__(self, handler_class, port: int = 0):
+        self.httpd = _HTTPServer(("127.0.0.1", port), handler_class)
+        self.httpd.stub = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def count(self, throttled: bool = False):
+        with self._lock:
+            self.requests += 1
+            if throttled:
+                self.throttled += 1
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubEmbeddingServer(_StubServer):
+    """OpenAI-compatible ``/v1/embeddings`` endpoint."""
+
+    def __init__(
+        self,
+        dimension: int = 64,
+        latency: float = 0.02,
+        throttle_rate: float = 0.0,
+        port: int = 0,
+    ):
+        self.dimension = dimension
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        super().__init__(_EmbeddingHandler, port)
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+
+class _EmbeddingHandler(_JSONHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        body = self._read_json()
+        if random.random() < stub.throttle_rate:
+            stub.count(throttled=True)
+            self._send_json(
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                status=429,
+            )
+            return
+
+        stub.count()
+        time.sleep(stub.latency)
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        self._send_json(
+            {
+                "object": "list",
+                "model": body.get("model", "stub"),
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": hash_embedding(text, stub.dimension),
+                    }
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+
+class StubCompletionServer(StubEmbeddingServer):
+    """OpenAI-compatible ``/v1/chat/completions`` plus ``/v1/embeddings``.
+
+    Replies with ``reply`` (by default a short answer citing match [1]),
+    one word per chunk when ``stream`` is requested, after
+    ``first_token_latency`` and then ``token_latency`` per chunk, so
+    time-to-first-token can be measured against a non-streaming call.
+    """
+
+    def __init__(
+        self,
+        reply: Optional[str] = None,
+        first_token_latency: float = 0.3,
+        token_latency: float = 0.02,
+        dimension: int = 64,
+        port: int = 0,
+    ):
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        super().__init__(dimension=dimension, latency=0.0, port=port)
+        self.httpd.RequestHandlerClass = _CompletionHandler
+
+    def reply_for(self, messages: List[Dict]) -> str:
+        if self.reply is not None:
+            return self.reply
+        query = messages[-1]["content"].splitlines()[0].removeprefix("Query: ")
+        words = " ".join(["According to the match data,"] * 10)
+        return f"{words} the answer to '{query}' is in the first match [1]."
+
+
+class _CompletionHandler(_EmbeddingHandler):
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            return super().do_POST()
+
+        stub = self.server.stub
+        body = self._read_json()
+        stub.count()
+        reply = stub.reply_for(body["messages"])
+        model = body.get("model", "stub")
+        time.sleep(stub.first_token_latency)
+
+        if not body.get("stream"):
+            tokens = reply.split(" ")
+            time.sleep(stub.token_latency * (len(tokens) - 1))
+            self._send_json(
+                {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": reply},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 0,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": len(tokens),
+                    },
+                }
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(stub.token_latency)
+            self._send_chunk(model, {"content": word if i == 0 else " " + word})
+        self._send_chunk(model, {}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_chunk(self, model: str, delta: Dict, finish_reason=None):
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class StubIndexServer(_StubServer):
+    """Minimal Pinecone-style ``/vectors/upsert`` endpoint."""
+
+    def __init__(self, latency: float = 0.05, throttle_rate: float = 0.0, port=0):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.vectors: Dict[str, Dict] = {}
+        super().__init__(_IndexHandler, port)
+
+
+class _IndexHandler(_JSONHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        body = self._read_json()
+        if random.random() < stub.throttle_rate:
+            stub.count(throttled=True)
+            self._send_json({"message": "Too many requests"}, status=429)
+            return
+
+        stub.count()
+        time.sleep(stub.latency)
+        with stub._lock:
+            for vector in body["vectors"]:
+                stub.vectors[vector["id"]] = vector
+        self._send_json({"upsertedCount": len(body["vectors"])})
+
+
+class StubIndexError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class StubIndexClient:
+    """Blocking index client for :class:`StubIndexServer`.
+
+    Mirrors the ``upsert`` call of ``pinecone.Index`` closely enough for
+    ``TennisVectorStore.store_matches``, including a ``status`` attribute on
+    errors so 429s are retried.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session = requests.Session()
+
+    def upsert(self, vectors: List[Dict]):
+        response = self.session.post(
+            f"{self.url}/vectors/upsert", json={"vectors": vectors}
+        )
+        if response.status_code != 200:
+            raise StubIndexError(response.status_code, response.text)
+        return response.json()
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from openai import AsyncOpenAI
+from app.main import app
+from app.services.container import ServiceContainer
+from app.services.local_index import LocalVectorIndex
+from stub_services import StubCompletionServer
+from test_streaming import build_index
+
+QUERIES = [
+    "Who won third round matches at Wimbledon in 2019?",
+    "who won third round matches at wimbledon in 2019",
+    "Who won third round matches at Wimbledon in 2019",
+]
+
+
+async def burst(client: httpx.AsyncClient, concurrency: int):
+    """Send ``concurrency`` copies of the same question at once"""
+    started = time.perf_counter()
+    responses = await asyncio.gather(
+        *[
+            client.post("/api/query", json={"query": QUERIES[i % len(QUERIES)]})
+            for i in range(concurrency)
+        ]
+    )
+    elapsed = time.perf_counter() - started
+    for response in responses:
+        response.raise_for_status()
+    answers = {response.json()["response"] for response in responses}
+    assert len(answers) == 1, "coalesced requests should get the same answer"
+    return elapsed
+
+
+async def test_coalescing(concurrency: int):
+    with StubCompletionServer() as llm, tempfile.TemporaryDirectory() as tmp:
+        openai = AsyncOpenAI(api_key="stub", base_url=llm.base_url, max_retries=0)
+        await build_index(tmp, openai)
+
+        container = ServiceContainer(
+            openai_client=openai, index=LocalVectorIndex.load(tmp)
+        )
+        app.state.container = container
+        try:
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                before = llm.requests
+                elapsed = await burst(client, concurrency)
+                stats = (await client.get("/api/pool-stats")).json()
+
+            print(f"\n{concurrency} concurrent requests answered in {elapsed:.2f}s")
+            print(f"upstream embedding + completion calls: {llm.requests - before}")
+            for stage, flights in stats["coalescing"].items():
+                print(f"  {stage:<11} {flights}")
+            assert stats["coalescing"]["generation"]["calls"] == 1
+        finally:
+            await container.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fire identical concurrent queries and report coalescing"
+    )
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(test_coalescing(args.concurrency))
@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from openai import AsyncOpenAI
+from app.services.vector_store import TennisVectorStore
+from stub_services import StubEmbeddingServer, StubIndexClient, StubIndexServer
+
+
+def sample_matches(count: int):
+    """Synthetic match records shaped like the ingestion output"""
+    matches = []
+    for i in range(count):
+        matches.append(
+            {
+                "match_id": f"2019-540_{i}",
+                "description": f"Player {i % 97} defeated Player {i % 89} "
+                f"in the R32 of Wimbledon 20190701 on Grass courts "
+                f"with a score of 6-4 6-{i % 5}.",
+                "tournament": {
+                    "name": "Wimbledon",
+                    "date": "20190701",
+                    "level": "G",
+                    "surface": "Grass",
+                },
+                "players": {
+                    "winner": {"name": f"Player {i % 97}", "id": str(i), "rank": 1},
+                    "loser": {"name": f"Player {i % 89}", "id": str(i), "rank": 2},
+                },
+                "score": f"6-4 6-{i % 5}",
+                "round": "R32",
+                "stats": {},
+            }
+        )
+    return matches
+
+
+async def run_pipeline(
+    matches, embed_concurrency: int, throttle_rate: float, upsert_concurrency: int
+):
+    with StubEmbeddingServer(throttle_rate=throttle_rate) as embeddings:
+        with StubIndexServer(throttle_rate=throttle_rate) as index:
+            openai = AsyncOpenAI(
+                api_key="stub", base_url=embeddings.base_url, max_retries=0
+            )
+            store = TennisVectorStore(
+                index=StubIndexClient(index.url), openai_client=openai
+            )
+            store.embed_concurrency = embed_concurrency
+            store.upsert_concurrency = upsert_concurrency
+
+            stored = []
+            stats = await store.store_matches(
+                matches, on_batch=lambda batch: stored.extend(batch)
+            )
+            store.close()
+            await openai.close()
+
+            assert len(stored) == len(matches), "every batch should be reported"
+            assert len(index.vectors) == len(matches), "every match should be upserted"
+            stats["embedding_429s"] = embeddings.throttled
+            stats["upsert_429s"] = index.throttled
+            return stats
+
+
+async def test_pipeline():
+    matches = sample_matches(2000)
+
+    print("\nSequential (1 embedding request, 1 upsert thread):")
+    print(await run_pipeline(matches, 1, 0.0, 1))
+
+    print("\nPipelined (8 embedding requests, 4 upsert threads):")
+    print(await run_pipeline(matches, 8, 0.0, 4))
+
+    print("\nPipelined with 10% of requests answered 429:")
+    print(await run_pipeline(matches, 8, 0.1, 4))
+
+
+if __name__ == "__main__":
+    asyncio.run(test_pipeline())
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+import uvicorn
+from openai import AsyncOpenAI
+from app.main import app
+from app.services.container import ServiceContainer
+from app.services.local_index import LocalVectorIndex
+from app.services.vector_store import TennisVectorStore
+from stub_services import StubCompletionServer
+from test_pipeline import sample_matches
+
+QUERY = "Who won third round matches at Wimbledon in 2019?"
+
+# Both requests must run the pipeline; the second would otherwise be
+# answered by replaying the first from the answer cache
+NO_CACHE = {"Cache-Control": "no-cache"}
+
+
+async def build_index(path: str, openai: AsyncOpenAI):
+    """Store synthetic matches in a local index using stub embeddings"""
+    store = TennisVectorStore(index=LocalVectorIndex(path), openai_client=openai)
+    await store.store_matches(sample_matches(500))
+    store.flush()
+    store.close()
+
+
+def serve(port: int) -> uvicorn.Server:
+    # The lifespan would build its own container; the test installs one
+    config = uvicorn.Config(
+        app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def buffered_query(client: httpx.AsyncClient):
+    started = time.perf_counter()
+    response = await client.post("/api/query", json={"query": QUERY}, headers=NO_CACHE)
+    response.raise_for_status()
+    return time.perf_counter() - started, response.json()["response"]
+
+
+async def streamed_query(client: httpx.AsyncClient):
+    started = time.perf_counter()
+    first_byte = first_token = None
+    event, done = None, None
+    async with client.stream(
+        "POST", "/api/query/stream", json={"query": QUERY}, headers=NO_CACHE
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+            elif line.startswith("data: "):
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - started
+                elif event == "done":
+                    done = json.loads(line[len("data: ") :])
+                elif event == "error":
+                    raise RuntimeError(line)
+    return first_byte, first_token, time.perf_counter() - started, done
+
+
+async def test_streaming():
+    with StubCompletionServer() as llm, tempfile.TemporaryDirectory() as tmp:
+        openai = AsyncOpenAI(api_key="stub", base_url=llm.base_url, max_retries=0)
+        await build_index(tmp, openai)
+
+        container = ServiceContainer(
+            openai_client=openai, index=LocalVectorIndex.load(tmp)
+        )
+        app.state.container = container
+        server = serve(8765)
+        try:
+            async with httpx.AsyncClient(
+                base_url="http://127.0.0.1:8765", timeout=30
+            ) as client:
+                total, buffered = await buffered_query(client)
+                print(f"\n/api/query         complete response after {total:.3f}s")
+
+                first_byte, first_token, total, done = await streamed_query(client)
+                print(f"/api/query/stream  first byte after     {first_byte:.3f}s")
+                print(f"                   first token after    {first_token:.3f}s")
+                print(f"                   complete after       {total:.3f}s")
+                print(f"server timing: {done['timing']}")
+                print(f"citations: {done['citations']}")
+
+                assert done["response"] == buffered, "streamed text should match"
+                assert done["citations"], "the stub reply cites match [1]"
+        finally:
+            server.should_exit = True
+            await container.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_streaming())